@@ -18,6 +18,7 @@ from bpy.props import (
         BoolProperty,
         EnumProperty,
         FloatProperty,
+        IntProperty,
         StringProperty,
         CollectionProperty,
         PointerProperty,
@@ -28,6 +29,7 @@ from bpy_extras.io_utils import (
         )
         
 from . import import_tex as import_tex
+from . import export_tex as export_tex
 from . import import_modscene as import_modscene
 from . import export_modscene as export_modscene
 from . import import_bmsscene as import_bmsscene
@@ -168,6 +170,19 @@ class ImportMOD(bpy.types.Operator, ImportHelper):
         
     bind_armature: PointerProperty(name="Bind To Armature", type=bpy.types.Object, poll=armature_poll)
     
+    proxy_textures: BoolProperty(
+        name="Proxy Textures",
+        description="Load textures from a smaller mipmap, for faster layout work",
+        default=False,
+        )
+        
+    proxy_texture_size: IntProperty(
+        name="Proxy Size",
+        description="Largest texture dimension loaded when using proxy textures",
+        default=128,
+        min=1,
+        )
+    
     def execute(self, context):
         from . import import_mod
         keywords = self.as_keywords(ignore=("axis_forward",
@@ -370,6 +385,38 @@ class ExportSKEL(bpy.types.Operator, ExportHelper):
                                     
         return export_skel.save(self, context, **keywords)
 
+# Preferences
+class AngelStudiosPreferences(bpy.types.AddonPreferences):
+    bl_idname = __name__
+
+    texture_cache_enabled: BoolProperty(
+        name="Cache Decoded Textures",
+        description="Keep decoded TEX/XTEX images on disk so later imports skip decoding",
+        default=True,
+        )
+
+    texture_cache_directory: StringProperty(
+        name="Cache Directory",
+        description="Where decoded textures are stored, leave empty to use the system temporary directory",
+        subtype='DIR_PATH',
+        default="",
+        )
+
+    texture_cache_size: IntProperty(
+        name="Cache Size (MB)",
+        description="Least recently used textures are removed once the cache grows past this size",
+        default=1024,
+        min=16,
+        )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "texture_cache_enabled")
+        sub = layout.column()
+        sub.enabled = self.texture_cache_enabled
+        sub.prop(self, "texture_cache_directory")
+        sub.prop(self, "texture_cache_size")
+
 # Custom menus
 class AngelStudiosMenu(bpy.types.Menu):
     bl_idname = "ANGEL_MT_tools_menu"
@@ -389,6 +436,7 @@ class AngelStudiosMenu(bpy.types.Menu):
         layout.separator()
         
         layout.operator("angelstudios.import_tex")
+        layout.operator("angelstudios.export_tex")
 
         layout.separator()
         
@@ -430,6 +478,7 @@ def menu_func_import(self, context):
 
 # Register factories
 def register():
+    bpy.utils.register_class(AngelStudiosPreferences)
     bpy.utils.register_class(ExportBMS)
     bpy.utils.register_class(ExportGEO)
     bpy.utils.register_class(ImportDLP)
@@ -443,6 +492,7 @@ def register():
     bpy.utils.register_class(ImportANIM)
     util_ops.register()
     import_tex.register()
+    export_tex.register()
     import_modscene.register()
     export_modscene.register()
     import_bmsscene.register()
@@ -462,6 +512,7 @@ def unregister():
     import_bmsscene.unregister()
     export_modscene.unregister()
     import_modscene.unregister()
+    export_tex.unregister()
     import_tex.unregister()
     util_ops.unregister()
     bpy.utils.unregister_class(ImportANIM)
@@ -475,6 +526,7 @@ def unregister():
     bpy.utils.unregister_class(ImportDLP)
     bpy.utils.unregister_class(ExportGEO)
     bpy.utils.unregister_class(ExportBMS)
+    bpy.utils.unregister_class(AngelStudiosPreferences)
 
 if __name__ == "__main__":
     register()
@@ -6,6 +6,17 @@ def read_string(file, length):
         str_bytes = str_bytes[:str_bytes.index(b'\x00')]
     return str_bytes.decode("utf-8")
 
+# ReadToken() binary implementation
+def read_null_terminated_string(file):
+    """read an ASCII string ending at a null byte, a space or the end of the file, the terminator is consumed"""
+    chars = []
+    while True:
+        c = file.read(1)
+        if c == b"\x00" or c == b"\x20" or len(c) == 0:
+            break
+        chars.append(c)
+    return b"".join(chars).decode('ascii')
+
 def write_string(file, s, length):
     str_bytes = s.encode("utf-8")
     str_bytes = str_bytes[:length]  # truncate if too long
@@ -0,0 +1,199 @@
+"""
+S3TC DXT1/DXT5 Texture Compression
+Every 4x4 block is compressed at once with numpy. Range fit takes the endpoints from the
+extent of the block colors along their principal axis, cluster fit additionally tries every
+ordered split of the projected colors into the 4 palette entries and keeps the best endpoints.
+"""
+
+import numpy as np
+
+from .dxt_decompress import DXT1_BLOCK_DTYPE, DXT5_BLOCK_DTYPE
+
+# blocks per cluster fit batch, keeps the partition arrays at a reasonable size
+CLUSTER_FIT_BATCH = 2048
+
+def _cluster_fit_partitions():
+    """every ordered split of 16 sorted points into 4 clusters, as (start of cluster 2, 3, 4) triples"""
+    partitions = []
+    for i in range(17):
+        for j in range(i, 17):
+            for k in range(j, 17):
+                partitions.append((i, j, k))
+    return np.array(partitions, dtype=np.intp)
+
+class DXTEncoder:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+        self.block_count_x = (self.width + 3) // 4
+        self.block_count_y = (self.height + 3) // 4
+
+    def _image_to_blocks(self, image):
+        """split an (height, width, 4) image into (blocks, 16, 4) texels, padding partial blocks by edge replication"""
+        image = np.asarray(image, dtype=np.uint8).reshape(self.height, self.width, 4)
+        pad_y = self.block_count_y * 4 - self.height
+        pad_x = self.block_count_x * 4 - self.width
+        if pad_x > 0 or pad_y > 0:
+            image = np.pad(image, ((0, pad_y), (0, pad_x), (0, 0)), mode='edge')
+        blocks = image.reshape(self.block_count_y, 4, self.block_count_x, 4, 4).transpose(0, 2, 1, 3, 4)
+        return blocks.reshape(-1, 16, 4).astype(np.float32)
+
+    def _principal_axis(self, colors, mean):
+        centered = colors - mean[:, None, :]
+        covariance = np.einsum('nki,nkj->nij', centered, centered)
+
+        # power iteration, starting from the largest covariance row
+        axis = covariance[np.arange(len(colors)), np.argmax(np.einsum('nii->ni', covariance), axis=1)]
+        for i in range(8):
+            axis = np.einsum('nij,nj->ni', covariance, axis)
+            length = np.linalg.norm(axis, axis=1, keepdims=True)
+            axis = np.divide(axis, length, out=np.zeros_like(axis), where=length > 0)
+        return axis
+
+    def _range_fit(self, colors):
+        mean = colors.mean(axis=1)
+        axis = self._principal_axis(colors, mean)
+        projection = np.einsum('nki,ni->nk', colors - mean[:, None, :], axis)
+        start = mean + axis * projection.max(axis=1)[:, None]
+        end = mean + axis * projection.min(axis=1)[:, None]
+        return start, end
+
+    def _cluster_fit(self, colors):
+        mean = colors.mean(axis=1)
+        axis = self._principal_axis(colors, mean)
+        start = np.empty_like(mean)
+        end = np.empty_like(mean)
+
+        partitions = _cluster_fit_partitions()
+        cluster_1, cluster_2, cluster_3 = partitions[:, 0], partitions[:, 1], partitions[:, 2]
+
+        # weight sums of the start endpoint for every partition
+        alpha2 = cluster_1 + (cluster_2 - cluster_1) * (4.0/9.0) + (cluster_3 - cluster_2) * (1.0/9.0)
+        beta2 = (cluster_2 - cluster_1) * (1.0/9.0) + (cluster_3 - cluster_2) * (4.0/9.0) + (16 - cluster_3)
+        alphabeta = (cluster_3 - cluster_1) * (2.0/9.0)
+        factor = alpha2 * beta2 - alphabeta * alphabeta
+        valid = np.abs(factor) > 1e-6
+        factor = np.where(valid, factor, 1.0)
+
+        for batch_start in range(0, len(colors), CLUSTER_FIT_BATCH):
+            batch = slice(batch_start, batch_start + CLUSTER_FIT_BATCH)
+            batch_colors = colors[batch]
+            batch_count = len(batch_colors)
+
+            # sort the colors along the axis, highest first so they run from start to end
+            order = np.argsort(-np.einsum('nki,ni->nk', batch_colors, axis[batch]), axis=1)
+            ordered = np.take_along_axis(batch_colors, order[:, :, None], axis=1)
+            prefix = np.zeros((batch_count, 17, 3), dtype=np.float32)
+            np.cumsum(ordered, axis=1, out=prefix[:, 1:])
+
+            sum_1 = prefix[:, cluster_1]
+            sum_2 = prefix[:, cluster_2]
+            sum_3 = prefix[:, cluster_3]
+            alphax = sum_1 + (sum_2 - sum_1) * (2.0/3.0) + (sum_3 - sum_2) * (1.0/3.0)
+            betax = prefix[:, 16][:, None, :] - alphax
+
+            # least squares endpoints for each partition
+            a = (alphax * beta2[None, :, None] - betax * alphabeta[None, :, None]) / factor[None, :, None]
+            b = (betax * alpha2[None, :, None] - alphax * alphabeta[None, :, None]) / factor[None, :, None]
+            np.clip(a, 0.0, 255.0, out=a)
+            np.clip(b, 0.0, 255.0, out=b)
+
+            error = ((a * a).sum(axis=2) * alpha2 + (b * b).sum(axis=2) * beta2
+                     + 2.0 * ((a * b).sum(axis=2) * alphabeta - (a * alphax).sum(axis=2) - (b * betax).sum(axis=2)))
+            error[:, ~valid] = np.inf
+            best = np.argmin(error, axis=1)
+
+            start[batch] = a[np.arange(batch_count), best]
+            end[batch] = b[np.arange(batch_count), best]
+
+        return start, end
+
+    def _quantize_565(self, color):
+        color = np.clip(np.rint(color), 0, 255).astype(np.int32)
+        r = (color[:, 0] * 31 + 127) // 255
+        g = (color[:, 1] * 63 + 127) // 255
+        b = (color[:, 2] * 31 + 127) // 255
+        return (r << 11) | (g << 5) | b
+
+    def _expand_565(self, color):
+        # same rounding as the decoder
+        temp = (color >> 11) * 255 + 16
+        r = (temp//32 + temp)//32
+        temp = ((color & 0x07E0) >> 5) * 255 + 32
+        g = (temp//64 + temp)//64
+        temp = (color & 0x001F) * 255 + 16
+        b = (temp//32 + temp)//32
+        return np.stack((r, g, b), axis=-1)
+
+    def _fit_endpoints(self, colors, start, end):
+        """quantize endpoints and pick the nearest palette entry for every texel, returns (color0, color1, codes, error)"""
+        color0 = self._quantize_565(start)
+        color1 = self._quantize_565(end)
+
+        # four color mode needs color0 > color1
+        swap = color0 < color1
+        color0, color1 = np.where(swap, color1, color0), np.where(swap, color0, color1)
+
+        e0 = self._expand_565(color0)
+        e1 = self._expand_565(color1)
+        palette = np.stack((e0, e1, (2*e0 + e1)//3, (e0 + 2*e1)//3), axis=1).astype(np.float32)
+
+        distance = ((colors[:, :, None, :] - palette[:, None, :, :]) ** 2).sum(axis=3)
+        codes = np.argmin(distance, axis=2)
+        error = np.take_along_axis(distance, codes[:, :, None], axis=2).sum(axis=(1, 2))
+
+        # equal endpoints decode in three color mode, where only code 0 is the same color
+        codes[color0 == color1] = 0
+        return color0, color1, codes, error
+
+    def _compress_color(self, texels, cluster_fit):
+        colors = texels[:, :, :3]
+        color0, color1, codes, error = self._fit_endpoints(colors, *self._range_fit(colors))
+
+        if cluster_fit:
+            # keep whichever fit has the lower error after quantization
+            cluster_color0, cluster_color1, cluster_codes, cluster_error = self._fit_endpoints(colors, *self._cluster_fit(colors))
+            better = cluster_error < error
+            color0 = np.where(better, cluster_color0, color0)
+            color1 = np.where(better, cluster_color1, color1)
+            codes = np.where(better[:, None], cluster_codes, codes)
+
+        shifts = np.arange(16, dtype=np.uint32) * 2
+        indices = np.bitwise_or.reduce(codes.astype(np.uint32) << shifts, axis=1)
+        return color0.astype(np.uint16), color1.astype(np.uint16), indices.astype(np.uint32)
+
+    def _compress_dxt5_alpha(self, texels):
+        alpha = texels[:, :, 3].astype(np.int32)
+        alpha0 = alpha.max(axis=1)
+        alpha1 = alpha.min(axis=1)
+
+        # eight alpha mode, same interpolation as the decoder
+        table = np.empty((len(texels), 8), dtype=np.int32)
+        table[:, 0] = alpha0
+        table[:, 1] = alpha1
+        for code in range(2, 8):
+            table[:, code] = ((8-code)*alpha0 + (code-1)*alpha1)//7
+
+        codes = np.argmin(np.abs(alpha[:, :, None] - table[:, None, :]), axis=2).astype(np.uint64)
+        codes[alpha0 == alpha1] = 0
+
+        shifts = np.arange(16, dtype=np.uint64) * np.uint64(3)
+        alpha_bits = np.bitwise_or.reduce(codes << shifts, axis=1)
+        alpha_bytes = np.empty((len(texels), 6), dtype=np.uint8)
+        for byte_index in range(6):
+            alpha_bytes[:, byte_index] = (alpha_bits >> np.uint64(8 * byte_index)) & np.uint64(0xFF)
+        return alpha0.astype(np.uint8), alpha1.astype(np.uint8), alpha_bytes
+
+    def DXT1Compress(self, image, cluster_fit=False):
+        texels = self._image_to_blocks(image)
+        blocks = np.zeros(len(texels), dtype=DXT1_BLOCK_DTYPE)
+        blocks['color0'], blocks['color1'], blocks['indices'] = self._compress_color(texels, cluster_fit)
+        return blocks.tobytes()
+
+    def DXT5Compress(self, image, cluster_fit=False):
+        texels = self._image_to_blocks(image)
+        blocks = np.zeros(len(texels), dtype=DXT5_BLOCK_DTYPE)
+        blocks['alpha0'], blocks['alpha1'], blocks['alpha_indices'] = self._compress_dxt5_alpha(texels)
+        blocks['color0'], blocks['color1'], blocks['indices'] = self._compress_color(texels, cluster_fit)
+        return blocks.tobytes()
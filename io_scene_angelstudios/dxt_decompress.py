@@ -5,6 +5,20 @@ Original C++ code https://github.com/Benjamin-Dobell/s3tc-dxt-decompression
 
 import struct
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# vectorized decoding is used whenever numpy is available
+HAS_NUMPY = np is not None
+
+if HAS_NUMPY:
+    DXT1_BLOCK_DTYPE = np.dtype([('color0', '<u2'), ('color1', '<u2'), ('indices', '<u4')])
+    DXT3_BLOCK_DTYPE = np.dtype([('alpha', '<u8'), ('color0', '<u2'), ('color1', '<u2'), ('indices', '<u4')])
+    DXT5_BLOCK_DTYPE = np.dtype([('alpha0', 'u1'), ('alpha1', 'u1'), ('alpha_indices', 'u1', (6,)),
+                                 ('color0', '<u2'), ('color1', '<u2'), ('indices', '<u4')])
+
 class DXTBuffer:
     def __init__(self, width, height):
         self.width = width
@@ -80,7 +94,7 @@ class DXTBuffer:
                         finalColor = ((r0+2*r1)//3, (g0+2*g1)//3, (b0+2*b1)//3, finalAlpha)
 
 
-                if x + i < width:
+                if x + i < width and y + j < height:
                     image_byte_index = ((y + j)*width + (x + i)) * 4
                     image[image_byte_index+0] = finalColor[0]
                     image[image_byte_index+1] = finalColor[1]
@@ -94,9 +108,20 @@ class DXTBuffer:
                 block_data = file.read(16)
                 self.DXT5DecompressBlock(x*4, y*4, self.width, self.height, block_data, image)
 
-    def DXT5Decompress(self, file):
-        image_data = bytearray(self.width * self.height * 4)
-        self.DXT5DecompressFile(file, image_data)
+    def DXT5DecompressBuffer(self, data, image):
+        blocks = self._get_block_view(data, 16)
+        for y in range(self.block_count_y):
+            for x in range(self.block_count_x):
+                block_offset = (y * self.block_count_x + x) * 16
+                self.DXT5DecompressBlock(x*4, y*4, self.width, self.height, blocks[block_offset:block_offset + 16], image)
+
+    def DXT5Decompress(self, source, out=None):
+        """decode from a file object or any bytes-like object, into out if given"""
+        image_data = out if out is not None else bytearray(self.width * self.height * 4)
+        if hasattr(source, "read"):
+            self.DXT5DecompressFile(source, image_data)
+        else:
+            self.DXT5DecompressBuffer(source, image_data)
         return image_data
 
 
@@ -140,7 +165,7 @@ class DXTBuffer:
                         else:
                             finalColor = (0, 0, 0, 255)
 
-                if x + i < width:
+                if x + i < width and y + j < height:
                     image_byte_index = ((y + j)*width + (x + i)) * 4
                     image[image_byte_index+0] = finalColor[0]
                     image[image_byte_index+1] = finalColor[1]
@@ -154,7 +179,125 @@ class DXTBuffer:
                 block_data = file.read(8)
                 self.DXT1DecompressBlock(x*4, y*4, self.width, self.height, block_data, image)
 
-    def DXT1Decompress(self, file):
-        image_data = bytearray(self.width * self.height * 4)
-        self.DXT1DecompressFile(file, image_data)
-        return image_data
\ No newline at end of file
+    def DXT1DecompressBuffer(self, data, image):
+        blocks = self._get_block_view(data, 8)
+        for y in range(self.block_count_y):
+            for x in range(self.block_count_x):
+                block_offset = (y * self.block_count_x + x) * 8
+                self.DXT1DecompressBlock(x*4, y*4, self.width, self.height, blocks[block_offset:block_offset + 8], image)
+
+    def DXT1Decompress(self, source, out=None):
+        """decode from a file object or any bytes-like object, into out if given"""
+        image_data = out if out is not None else bytearray(self.width * self.height * 4)
+        if hasattr(source, "read"):
+            self.DXT1DecompressFile(source, image_data)
+        else:
+            self.DXT1DecompressBuffer(source, image_data)
+        return image_data
+
+    def _get_block_view(self, data, block_size):
+        """a byte memoryview of the block data, blocks are sliced from it without copying"""
+        view = memoryview(data).cast('B')
+        needed = self.block_count_x * self.block_count_y * block_size
+        if len(view) < needed:
+            # small mips are stored truncated, pad them out to a full block
+            view = memoryview(bytes(view) + bytes(needed - len(view)))
+        return view
+
+
+    ######################################################
+    # VECTORIZED (NUMPY) DECODING
+    ######################################################
+    def _read_blocks(self, data, block_dtype):
+        return np.frombuffer(self._get_block_view(data, block_dtype.itemsize), dtype=block_dtype, count=self.block_count_x * self.block_count_y)
+
+    def _expand_565(self, color):
+        color = color.astype(np.int32)
+        temp = (color >> 11) * 255 + 16
+        r = (temp//32 + temp)//32
+        temp = ((color & 0x07E0) >> 5) * 255 + 32
+        g = (temp//64 + temp)//64
+        temp = (color & 0x001F) * 255 + 16
+        b = (temp//32 + temp)//32
+        return np.stack((r, g, b), axis=-1)
+
+    def _decode_color_blocks(self, blocks, allow_three_color):
+        """returns a (blocks, 16, 4) array of RGBA texels with alpha set to 255"""
+        color0 = blocks['color0']
+        color1 = blocks['color1']
+        e0 = self._expand_565(color0)
+        e1 = self._expand_565(color1)
+
+        palette = np.empty((len(blocks), 4, 4), dtype=np.int32)
+        palette[:, 0, :3] = e0
+        palette[:, 1, :3] = e1
+        palette[:, 2, :3] = (2*e0 + e1)//3
+        palette[:, 3, :3] = (e0 + 2*e1)//3
+        palette[:, :, 3] = 255
+
+        if allow_three_color:
+            three_color = color0 <= color1
+            palette[three_color, 2, :3] = (e0[three_color] + e1[three_color])//2
+            palette[three_color, 3, :3] = 0
+        palette = palette.astype(np.uint8)
+
+        shifts = np.arange(16, dtype=np.uint32) * 2
+        codes = (blocks['indices'][:, None] >> shifts) & 0x03
+        return palette[np.arange(len(blocks))[:, None], codes]
+
+    def _decode_dxt5_alpha(self, blocks):
+        """returns a (blocks, 16) array of alpha values"""
+        alpha0 = blocks['alpha0'].astype(np.int32)
+        alpha1 = blocks['alpha1'].astype(np.int32)
+
+        table = np.empty((len(blocks), 8), dtype=np.int32)
+        table[:, 0] = alpha0
+        table[:, 1] = alpha1
+        eight_alpha = alpha0 > alpha1
+        for code in range(2, 8):
+            if code <= 5:
+                six_alpha_value = ((6-code)*alpha0 + (code-1)*alpha1)//5
+            else:
+                six_alpha_value = 0 if code == 6 else 255
+            table[:, code] = np.where(eight_alpha, ((8-code)*alpha0 + (code-1)*alpha1)//7, six_alpha_value)
+
+        # 48 bits of 3 bit codes
+        alpha_bits = np.zeros(len(blocks), dtype=np.uint64)
+        for byte_index in range(6):
+            alpha_bits |= blocks['alpha_indices'][:, byte_index].astype(np.uint64) << np.uint64(8 * byte_index)
+
+        shifts = np.arange(16, dtype=np.uint64) * np.uint64(3)
+        codes = ((alpha_bits[:, None] >> shifts) & np.uint64(0x07)).astype(np.intp)
+        return np.take_along_axis(table, codes, axis=1)
+
+    def _decode_dxt3_alpha(self, blocks):
+        """returns a (blocks, 16) array of alpha values"""
+        shifts = np.arange(16, dtype=np.uint64) * np.uint64(4)
+        return ((blocks['alpha'][:, None] >> shifts) & np.uint64(0x0F)).astype(np.int32) * 17
+
+    def _blocks_to_image(self, texels, out=None):
+        """scatter (blocks, 16, 4) uint8 texels into an (height, width, 4) uint8 image, out if given"""
+        if out is None:
+            out = np.empty((self.height, self.width, 4), dtype=np.uint8)
+        image = texels.reshape(self.block_count_y, self.block_count_x, 4, 4, 4).transpose(0, 2, 1, 3, 4)
+        image = image.reshape(self.block_count_y * 4, self.block_count_x * 4, 4)
+        out[:] = image[:self.height, :self.width]
+        return out
+
+    # the array decoders read straight from any bytes-like object (bytes, mmap slices, memoryviews)
+    def DXT1DecompressArray(self, data, out=None):
+        blocks = self._read_blocks(data, DXT1_BLOCK_DTYPE)
+        texels = self._decode_color_blocks(blocks, True)
+        return self._blocks_to_image(texels, out)
+
+    def DXT3DecompressArray(self, data, out=None):
+        blocks = self._read_blocks(data, DXT3_BLOCK_DTYPE)
+        texels = self._decode_color_blocks(blocks, False)
+        texels[:, :, 3] = self._decode_dxt3_alpha(blocks)
+        return self._blocks_to_image(texels, out)
+
+    def DXT5DecompressArray(self, data, out=None):
+        blocks = self._read_blocks(data, DXT5_BLOCK_DTYPE)
+        texels = self._decode_color_blocks(blocks, False)
+        texels[:, :, 3] = self._decode_dxt5_alpha(blocks)
+        return self._blocks_to_image(texels, out)
@@ -0,0 +1,131 @@
+import bpy
+
+from bpy.props import (
+        BoolProperty,
+        EnumProperty,
+        IntProperty,
+        StringProperty,
+        )
+from bpy_extras.io_utils import (
+        ExportHelper,
+        )
+
+class ExportTEX(bpy.types.Operator, ExportHelper):
+    """Export image to Angel Studios TEX file format"""
+    bl_idname = "angelstudios.export_tex"
+    bl_label = 'Export TEX Image'
+
+    filename_ext = ".tex"
+    filter_glob: StringProperty(default="*.tex;*.xtex", options={'HIDDEN'})
+
+    image_name: StringProperty(name="Image")
+    
+    tex_format : EnumProperty(items = [('DXT1','DXT1','Compressed, no alpha','',22), 
+                                       ('DXT5','DXT5','Compressed with alpha','',26),
+                                       ('RGB888','RGB888','Uncompressed, no alpha','',17),
+                                       ('RGB8888','RGB8888','Uncompressed with alpha','',18),
+                                       ('P8','P8','256 color palette, no alpha','',1),
+                                       ('PA8','PA8','256 color palette with alpha','',14),
+                                       ('P4','P4','16 color palette, no alpha','',15),
+                                       ('PA4','PA4','16 color palette with alpha','',16),
+                                       ('P8A8','P8A8','256 color palette with separate alpha','',2)],
+                              name = "Format",
+                              default = 'DXT5')
+                              
+    high_quality: BoolProperty(
+        name="High Quality Compression",
+        description="Search every endpoint clustering when compressing DXT blocks. Much slower",
+        default=False,
+        )
+
+    palette_method : EnumProperty(items = [('MEDIAN_CUT','Median Cut','Fast','',0), 
+                                           ('KMEANS','K-Means','Refine the median cut palette, slower','',1)],
+                                  name = "Palette",
+                                  default = 'MEDIAN_CUT')
+                                  
+    dither : EnumProperty(items = [('NONE','None','','',0), 
+                                   ('ORDERED','Ordered','4x4 Bayer pattern','',1),
+                                   ('ERROR_DIFFUSION','Error Diffusion','Floyd-Steinberg, slower','',2)],
+                          name = "Dither",
+                          default = 'NONE')
+
+    generate_mips: BoolProperty(
+        name="Generate Mipmaps",
+        default=True,
+        )
+    
+    mip_filter : EnumProperty(items = [('BOX','Box','Average 2x2 texels','',0), 
+                                       ('KAISER','Kaiser','Kaiser windowed sinc, sharper','',1)],
+                              name = "Mipmap Filter",
+                              default = 'BOX')
+                              
+    gamma_correct: BoolProperty(
+        name="Gamma Correct",
+        description="Average colors in linear space",
+        default=True,
+        )
+        
+    preserve_alpha_coverage: BoolProperty(
+        name="Preserve Alpha Coverage",
+        description="Scale mipmap alpha so alpha tested textures don't fade out with distance",
+        default=False,
+        )
+        
+    min_mip_size: IntProperty(
+        name="Smallest Mipmap",
+        description="Stop generating mipmaps below this size",
+        default=1,
+        min=1,
+        )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop_search(self, "image_name", bpy.data, "images")
+        layout.prop(self, "tex_format")
+        sub = layout.row()
+        sub.enabled = self.tex_format in ('DXT1', 'DXT5')
+        sub.prop(self, "high_quality")
+        sub = layout.column()
+        sub.enabled = self.tex_format in ('P8', 'PA8', 'P4', 'PA4', 'P8A8')
+        sub.prop(self, "palette_method")
+        sub.prop(self, "dither")
+        layout.prop(self, "generate_mips")
+        sub = layout.column()
+        sub.enabled = self.generate_mips
+        sub.prop(self, "mip_filter")
+        sub.prop(self, "gamma_correct")
+        sub.prop(self, "preserve_alpha_coverage")
+        sub.prop(self, "min_mip_size")
+        
+    def invoke(self, context, event):
+        # default to the image open in the image editor
+        space = context.space_data
+        if len(self.image_name) == 0 and space is not None and space.type == 'IMAGE_EDITOR' and space.image is not None:
+            self.image_name = space.image.name
+        return ExportHelper.invoke(self, context, event)
+
+    def execute(self, context):
+        from .tex_file import TEXFile, TEXType, blender_image_to_rgba
+
+        image = bpy.data.images.get(self.image_name)
+        if image is None:
+            self.report({"ERROR"}, "No image selected")
+            return {'CANCELLED'}
+        
+        rgba = blender_image_to_rgba(image)
+        levels = [rgba]
+        if self.generate_mips:
+            from .mip_chain import generate_mip_chain
+            levels = generate_mip_chain(rgba, self.mip_filter, self.gamma_correct, self.preserve_alpha_coverage, min_size=self.min_mip_size)
+        
+        tex = TEXFile()
+        tex.set_rgba_mips(levels, TEXType[self.tex_format], self.high_quality, self.palette_method, self.dither)
+        tex.write(self.properties.filepath)
+        
+        return {'FINISHED'}
+
+def register():
+    bpy.utils.register_class(ExportTEX)
+
+def unregister():
+    bpy.utils.unregister_class(ExportTEX)
@@ -1,11 +1,34 @@
 import shlex
+from bisect import bisect_left
+
+# characters shlex gives a meaning to, lines without any of them split the same with str.split
+SHLEX_SPECIAL_CHARS = ('"', "'", "\\")
+
+def split_tokens(line):
+    """split a line into tokens, only lines with quotes or escapes go through shlex"""
+    for char in SHLEX_SPECIAL_CHARS:
+        if char in line:
+            return shlex.split(line)
+    return line.split()
 
 class FileParser:
     def __init__(self, lines):
         self.__current_line = 0
         self.__lines = lines
         self.__line_count = len(lines)
-        
+
+        # first token -> sorted numbers of the lines starting with it, so skip_to doesn't have to split lines
+        self.__line_index = {}
+        for x, line in enumerate(lines):
+            first_token = line.split(None, 1)
+            if len(first_token) == 0:
+                continue
+            line_numbers = self.__line_index.get(first_token[0])
+            if line_numbers is None:
+                self.__line_index[first_token[0]] = [x]
+            else:
+                line_numbers.append(x)
+
     def parse_float(self, str):
         if str == "-1.#QNAN0" or str == "1.#QNAN0":
             return float('nan')
@@ -18,7 +41,7 @@ class FileParser:
         return line
 
     def read_tokens(self):
-        return shlex.split(self.read_line())
+        return split_tokens(self.read_line())
     
     def read_int(self):
         tok = self.read_tokens()
@@ -42,8 +65,42 @@ class FileParser:
         tok = self.read_tokens()
         if len(tok) < 1:
             raise Exception(f"Failed to parse float array at line {self.__current_line} : {tok}")
-        return [self.parse_float(f) for f in tok[1:]]
-        
+        return self.__parse_float_list(tok[1:])
+
+    def __parse_float_list(self, tokens):
+        try:
+            return list(map(float, tokens))
+        except ValueError:
+            # QNAN values written by the original tools
+            return [self.parse_float(f) for f in tokens]
+
+    def __read_rows(self, query, max_lines, parse_row):
+        # same as looping skip_to(query, max_lines) and reading the found line, without the per line overhead
+        rows = []
+        line_numbers = self.__line_index.get(query, ())
+        next_line = self.__current_line
+        for i in range(bisect_left(line_numbers, next_line), len(line_numbers)):
+            x = line_numbers[i]
+            if max_lines is not None and x >= next_line + max_lines:
+                break
+            if parse_row is not None:
+                rows.append(parse_row(split_tokens(self.__lines[x])[1:]))
+            next_line = x + 1
+        self.__current_line = next_line
+        return rows
+
+    def read_float_rows(self, query, max_lines=None):
+        """read every run of "query x y z" lines as float lists, like looping skip_to and read_float_array"""
+        return self.__read_rows(query, max_lines, self.__parse_float_list)
+
+    def read_int_rows(self, query, max_lines=None):
+        """read every run of "query a b c" lines as int lists, like looping skip_to and read_int_array"""
+        return self.__read_rows(query, max_lines, lambda tokens: list(map(int, tokens)))
+
+    def skip_rows(self, query, max_lines=None):
+        """move past every run of "query ..." lines like read_float_rows does, without parsing them"""
+        self.__read_rows(query, max_lines, None)
+
     def skip_to(self, query, max_lines=None):
         max_line = self.__line_count
         if max_lines is not None:
@@ -57,12 +114,19 @@ class FileParser:
         else:
             raise Exception("skip_to expects string or list/tuple query")
         
-        for x in range(self.__current_line, max_line):
-            tokens = self.__lines[x].split()
-            if len(tokens) > 0 and tokens[0] in query_list:
-                self.__current_line = x
-                return True
-                
+        # first line at or after the current one starting with any of the queries
+        found_line = max_line
+        for query_token in query_list:
+            line_numbers = self.__line_index.get(query_token)
+            if line_numbers is None:
+                continue
+            i = bisect_left(line_numbers, self.__current_line)
+            if i < len(line_numbers) and line_numbers[i] < found_line:
+                found_line = line_numbers[i]
+
+        if found_line < max_line:
+            self.__current_line = found_line
+            return True
         return False
     
     def skip_to_group_end(self):
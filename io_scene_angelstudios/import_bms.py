@@ -26,8 +26,10 @@ def vert_key(position, normal=None):
 ######################################################
 # IMPORT
 ######################################################
-def import_bms_object(filepath):
+def import_bms_object(filepath, texture_index=None, material_registry=None):
     scn = bpy.context.scene
+    if texture_index is None:
+        texture_index = utils.TextureSearchIndex()
 
     points = []
     textures = []
@@ -108,16 +110,25 @@ def import_bms_object(filepath):
         for x in range(num_textures):
             texture_name = textures[x]
 
+            # BMS materials are named after their texture and have nothing else
+            material_key = (texture_name,)
+            mat = material_registry.get(material_key) if material_registry is not None else None
+            if mat is not None:
+                ob.data.materials.append(mat)
+                continue
+
             asset_root_path = os.path.abspath(os.path.join(os.path.dirname(filepath), ".."))
             if os.path.basename(asset_root_path).upper() == "BMS": # one more, we're in a BMS dir
                 asset_root_path = os.path.abspath(os.path.join(os.path.dirname(filepath), "..", ".."))
             asset_base_path = os.path.abspath(os.path.dirname(filepath))
-            texture = utils.try_load_dds_texture(texture_name, (os.path.join(asset_root_path, "TEX16O"), os.path.join(asset_root_path, "TEX16A"), asset_base_path))
+            texture = utils.try_load_dds_texture(texture_name, (os.path.join(asset_root_path, "TEX16O"), os.path.join(asset_root_path, "TEX16A"), asset_base_path), texture_index)
 
             mat = create_material(texture_name)
             mat_wrap = node_shader_utils.PrincipledBSDFWrapper(mat, is_readonly=False) 
             mat_wrap.base_color_texture.image = texture
 
+            if material_registry is not None:
+                material_registry.add(material_key, mat)
             ob.data.materials.append(mat)
 
         # compile vertex_map
@@ -28,24 +28,15 @@ class ImportBMSSceneOperator(bpy.types.Operator):
         from . import import_bms
         
         # import models
+        texture_index = utils.TextureSearchIndex()
+        material_registry = utils.MaterialRegistry()
         for file in os.listdir(self.directory):
             file_l = file.lower()
             if file_l.endswith(".bms"):
                 print("IMPORTING " + file_l)
                 file_noext = os.path.splitext(file)[0]
-                imported_ob = import_bms.import_bms_object(filepath=os.path.join(self.directory, file))
+                imported_ob = import_bms.import_bms_object(filepath=os.path.join(self.directory, file), texture_index=texture_index, material_registry=material_registry)
                 imported_ob.name = file_noext
-        
-        # postprocess: merge down materials
-        mats = bpy.data.materials
-        for mat in mats:
-            (original, _, ext) = mat.name.rpartition(".")
-            
-            if ext.isnumeric() and mats.find(original) != -1:
-                print("%s -> %s" %(mat.name, original))
-                
-                mat.user_remap(mats[original])
-                mats.remove(mat)
 
         return {'FINISHED'}
 
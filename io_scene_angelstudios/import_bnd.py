@@ -95,9 +95,9 @@ def read_bnd_file(file):
         
         bpy.ops.object.mode_set(mode='EDIT', toggle=False)
         
-        while parser.skip_to("v", 16):
-            bm.verts.new((utils.translate_vector(parser.read_float_array())))
-            bm.verts.ensure_lookup_table()
+        for vertex in parser.read_float_rows("v", 16):
+            bm.verts.new(utils.translate_vector(vertex))
+        bm.verts.ensure_lookup_table()
             
         while parser.skip_to("mtl", 32):
             # material
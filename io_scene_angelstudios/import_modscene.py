@@ -1,5 +1,5 @@
 import bpy
-import os
+import os, time
 from . import utils as utils
 
 from bpy.props import (
@@ -20,41 +20,94 @@ class ImportMODSceneOperator(bpy.types.Operator):
 
     directory: StringProperty(name="Input Directory")
     scene_name: StringProperty(name="Scene Name")
+    
+    parallel_textures: BoolProperty(
+        name="Decode Textures in Parallel",
+        description="Decode all scene textures with worker processes before importing models",
+        default=True,
+        )
+        
+    parallel_models: BoolProperty(
+        name="Parse Models in Parallel",
+        description="Parse model files with worker processes while objects are being created",
+        default=True,
+        )
+        
+    proxy_textures: BoolProperty(
+        name="Proxy Textures",
+        description="Load textures from a smaller mipmap, for faster layout work",
+        default=False,
+        )
+        
+    proxy_texture_size: IntProperty(
+        name="Proxy Size",
+        description="Largest texture dimension loaded when using proxy textures",
+        default=128,
+        min=1,
+        )
 
     @classmethod
     def poll(cls, context):
         return True
 
+    def prefetch_textures(self, scene_files, texture_index, max_texture_size):
+        from . import import_mod
+        from . import mod_file
+        from . import texture_prefetch
+        
+        texture_requests = []
+        for file in scene_files:
+            filepath = os.path.join(self.directory, file)
+            try:
+                search_paths = import_mod.get_texture_search_paths(filepath)
+                texture_requests.extend((texture_name, search_paths) for texture_name in mod_file.read_mod_texture_names(filepath))
+            except Exception as e:
+                print(f"Failed to read textures from {file}: {e}")
+        
+        time1 = time.perf_counter()
+        created = texture_prefetch.prefetch_textures(texture_requests, texture_index, max_size=max_texture_size)
+        if created > 0:
+            print(" decoded %i textures in %.4f sec." % (created, time.perf_counter() - time1))
+
     def execute(self, context):
         if len(self.scene_name) == 0:
             self.report({"ERROR"}, "Scene name was empty")
         else:
             from . import import_mod
+            from . import mod_file
+            from . import mod_prefetch
             
             # import models
             scene_prefix = f"{self.scene_name}_"
             matrix_basepath = os.path.join(os.path.abspath(os.path.join(self.directory, "..")), "geometry") # Dis-gusting. Temporary.
-            for file in os.listdir(self.directory):
+            texture_index = utils.TextureSearchIndex()
+            material_registry = utils.MaterialRegistry()
+            max_texture_size = self.proxy_texture_size if self.proxy_textures else 0
+            scene_files = []
+            for file in sorted(os.listdir(self.directory)):
                 file_l = file.lower()
                 if file_l.startswith(scene_prefix) and (file_l.endswith(".mod") or file_l.endswith(".xmod")):
-                    print("IMPORTING " + file_l)
-                    file_noext = os.path.splitext(file)[0]
-                    imported_ob = import_mod.import_mod_object(filepath=os.path.join(self.directory, file))
-                    imported_ob.name = file_noext[len(scene_prefix):]
-                    imported_ob_basename = utils.object_basename(file_noext)
-                    if os.path.exists(os.path.join(matrix_basepath, f"{imported_ob_basename}.mtx")):
-                        imported_ob.matrix_world = utils.read_matrix3x4(imported_ob_basename, matrix_basepath)
+                    scene_files.append(file)
+            
+            if self.parallel_textures:
+                self.prefetch_textures(scene_files, texture_index, max_texture_size)
+            
+            # models are parsed ahead by workers, objects are created in file order so names are stable
+            scene_filepaths = [os.path.join(self.directory, file) for file in scene_files]
+            if self.parallel_models:
+                parsed_models = mod_prefetch.iter_mod_files(scene_filepaths)
+            else:
+                parsed_models = ((filepath, mod_file.ModFile(filepath)) for filepath in scene_filepaths)
             
-            # postprocess: merge down materials
-            mats = bpy.data.materials
-            for mat in mats:
-                (original, _, ext) = mat.name.rpartition(".")
-                
-                if ext.isnumeric() and mats.find(original) != -1:
-                    print("%s -> %s" %(mat.name, original))
-                    
-                    mat.user_remap(mats[original])
-                    mats.remove(mat)
+            for filepath, mod in parsed_models:
+                file = os.path.basename(filepath)
+                print("IMPORTING " + file.lower())
+                file_noext = os.path.splitext(file)[0]
+                imported_ob = import_mod.build_mod_object(mod, filepath, texture_index=texture_index, max_texture_size=max_texture_size, material_registry=material_registry)
+                imported_ob.name = file_noext[len(scene_prefix):]
+                imported_ob_basename = utils.object_basename(file_noext)
+                if os.path.exists(os.path.join(matrix_basepath, f"{imported_ob_basename}.mtx")):
+                    imported_ob.matrix_world = utils.read_matrix3x4(imported_ob_basename, matrix_basepath)
 
         return {'FINISHED'}
 
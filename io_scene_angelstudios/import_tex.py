@@ -22,12 +22,16 @@ class ImportTEX(bpy.types.Operator, ImportHelper):
         filepath = self.properties.filepath
         image_name = bpy.path.display_name_from_filepath(self.properties.filepath)
         
-        tex = TEXFile(filepath)
-        if tex.is_compressed_format():
-            tex.decompress()
-            
-        tf_img = tex.to_blender_image(image_name)
-        tf_img.filepath_raw = filepath # set filepath manually for TEX stuff, since it didn't come from an actual file import
+        # the file stays mapped until closed, which locks it on Windows
+        tex = TEXFile(filepath, lazy=True)
+        try:
+            if tex.is_compressed_format():
+                tex.decompress()
+                
+            tf_img = tex.to_blender_image(image_name)
+            tf_img.filepath_raw = filepath # set filepath manually for TEX stuff, since it didn't come from an actual file import
+        finally:
+            tex.close()
         
         return {'FINISHED'}
 
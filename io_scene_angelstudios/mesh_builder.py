@@ -0,0 +1,156 @@
+"""
+Bulk mesh construction for the MOD importers
+Triangles are collected as per loop arrays, vertices are welded in one pass over all loops
+and the result is written to a Blender mesh with foreach_set. This module does not import bpy.
+"""
+
+import numpy as np
+
+def _row_keys(rows):
+    """view each row of a 2D array as one opaque value, so rows can be compared and sorted as a whole"""
+    rows = np.ascontiguousarray(rows)
+    return rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1]))).reshape(-1)
+
+def weld_vertices(positions, normals):
+    """merge loops with bitwise identical positions and normals.
+    Returns (vertex index per loop, loop index of each vertex), vertices are ordered by first use."""
+    if len(positions) == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+
+    keys = _row_keys(np.concatenate((positions, normals), axis=1))
+    unique_keys, first_loops, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+    # np.unique sorts, renumber by first use instead
+    order = np.argsort(first_loops, kind='stable')
+    rank = np.empty(len(order), dtype=np.intp)
+    rank[order] = np.arange(len(order))
+    return rank[inverse.reshape(-1)], first_loops[order]
+
+def triangle_strips_to_array(indices, starts, counts, clockwise, drop_degenerate=False):
+    """flat triangle indices of many strips stored back to back in one index array.
+    starts and counts locate each strip in indices, clockwise is given per strip.
+    The winding alternates within each strip, a strip of 3 is a single triangle.
+    With drop_degenerate, triangles using an index twice (strip stitching) are left out."""
+    starts = np.asarray(starts, dtype=np.intp)
+    counts = np.asarray(counts, dtype=np.intp)
+    clockwise = np.asarray(clockwise, dtype=bool)
+
+    triangle_counts = np.maximum(counts - 2, 0)
+    strip_ids = np.repeat(np.arange(len(starts)), triangle_counts)
+    first_triangles = np.cumsum(triangle_counts) - triangle_counts
+    local_triangles = np.arange(len(strip_ids)) - first_triangles[strip_ids]
+    corners = (starts[strip_ids] + local_triangles)[:, np.newaxis] + np.arange(3)
+
+    # every other triangle has its first two corners swapped, starting with the first one for clockwise strips
+    swapped = (local_triangles & 1) == np.where(clockwise[strip_ids], 0, 1)
+    corners[swapped, :2] = corners[swapped, 1::-1]
+    triangles = np.asarray(indices)[corners]
+
+    if drop_degenerate:
+        triangles = triangles[(triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) & (triangles[:, 0] != triangles[:, 2])]
+    return triangles.reshape(-1)
+
+def find_valid_triangles(triangles):
+    """mask of triangles without repeated vertices that don't cover the same vertices as an earlier triangle"""
+    if len(triangles) == 0:
+        return np.zeros(0, dtype=bool)
+
+    sorted_triangles = np.sort(triangles, axis=1)
+    valid = (sorted_triangles[:, 0] != sorted_triangles[:, 1]) & (sorted_triangles[:, 1] != sorted_triangles[:, 2])
+
+    valid_indices = np.flatnonzero(valid)
+    unique_keys, first_indices = np.unique(_row_keys(sorted_triangles[valid_indices]), return_index=True)
+    valid[:] = False
+    valid[valid_indices[first_indices]] = True
+    return valid
+
+def _concatenate(chunks, width, dtype):
+    if len(chunks) == 0:
+        return np.zeros((0, width), dtype=dtype)
+    return np.concatenate(chunks).astype(dtype, copy=False).reshape(-1, width)
+
+class ModMeshBuilder:
+    """collects triangles as arrays of loops, then welds them and fills a mesh in bulk"""
+    def __init__(self):
+        # lists of per loop arrays, one entry per add_triangles call
+        self.loop_positions = []
+        self.loop_normals = []
+        self.loop_uvs = []
+        self.loop_colors = []
+        self.loop_bones = []
+        self.face_material_indices = []
+
+        # filled in by weld()
+        self.vertex_positions = None
+        self.loop_vertex_indices = None
+        self.face_mask = None
+
+    def add_triangles(self, positions, normals, uvs, colors, material_index, bones=None):
+        """add triangles from per loop arrays, three loops per triangle"""
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        self.loop_positions.append(positions)
+        self.loop_normals.append(np.asarray(normals, dtype=np.float64).reshape(-1, 3))
+        self.loop_uvs.append(np.asarray(uvs, dtype=np.float32).reshape(-1, 2))
+        self.loop_colors.append(np.asarray(colors, dtype=np.float32).reshape(-1, 4))
+        if bones is not None:
+            self.loop_bones.append(np.asarray(bones, dtype=np.intp).reshape(-1))
+        self.face_material_indices.append(np.full(len(positions) // 3, material_index, dtype=np.int32))
+
+    def weld(self):
+        """assign vertex indices to all loops at once and drop triangles bmesh would have rejected"""
+        positions = _concatenate(self.loop_positions, 3, np.float64)
+        normals = _concatenate(self.loop_normals, 3, np.float64)
+        self.loop_vertex_indices, vertex_loops = weld_vertices(positions, normals)
+        self.vertex_positions = positions[vertex_loops]
+        self.face_mask = find_valid_triangles(self.loop_vertex_indices.reshape(-1, 3))
+
+        skipped_face_count = len(self.face_mask) - np.count_nonzero(self.face_mask)
+        if skipped_face_count > 0:
+            print(f"Skipped {skipped_face_count} degenerate or duplicate triangles")
+
+    def get_vertex_groups(self, bone_count):
+        """sorted vertex indices for every bone, from the bones passed to add_triangles"""
+        loop_bones = _concatenate(self.loop_bones, 1, np.intp).reshape(-1)
+        pairs = np.unique(loop_bones * (len(self.vertex_positions) + 1) + self.loop_vertex_indices)
+        pair_bones = pairs // (len(self.vertex_positions) + 1)
+        pair_vertices = pairs % (len(self.vertex_positions) + 1)
+
+        bone_starts = np.searchsorted(pair_bones, np.arange(bone_count + 1))
+        return [pair_vertices[bone_starts[bone]:bone_starts[bone + 1]].tolist() for bone in range(bone_count)]
+
+    def build(self, me):
+        """weld if needed and write everything to an empty mesh"""
+        if self.loop_vertex_indices is None:
+            self.weld()
+
+        loop_mask = np.repeat(self.face_mask, 3)
+        loop_vertex_indices = self.loop_vertex_indices[loop_mask]
+        vertex_count = len(self.vertex_positions)
+        loop_count = len(loop_vertex_indices)
+        face_count = loop_count // 3
+
+        me.vertices.add(vertex_count)
+        me.vertices.foreach_set("co", self.vertex_positions.astype(np.float32).reshape(-1))
+
+        me.loops.add(loop_count)
+        me.loops.foreach_set("vertex_index", loop_vertex_indices.astype(np.int32))
+
+        me.polygons.add(face_count)
+        me.polygons.foreach_set("loop_start", np.arange(0, loop_count, 3, dtype=np.int32))
+        try:
+            me.polygons.foreach_set("loop_total", np.full(face_count, 3, dtype=np.int32))
+        except (AttributeError, TypeError, RuntimeError):
+            pass # read only in newer Blender versions, derived from loop_start
+        me.polygons.foreach_set("material_index", _concatenate(self.face_material_indices, 1, np.int32).reshape(-1)[self.face_mask])
+        me.polygons.foreach_set("use_smooth", np.ones(face_count, dtype=bool))
+
+        # the second UV layer is left empty
+        uv_layers = (me.uv_layers.new(), me.uv_layers.new())
+        uvs = _concatenate(self.loop_uvs, 2, np.float32)[loop_mask]
+        uv_layers[0].data.foreach_set("uv", uvs.reshape(-1))
+        vc_layer = me.vertex_colors.new()
+        colors = _concatenate(self.loop_colors, 4, np.float32)[loop_mask]
+        vc_layer.data.foreach_set("color", colors.reshape(-1))
+
+        me.update(calc_edges=True)
+        me.validate()
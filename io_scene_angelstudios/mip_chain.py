@@ -0,0 +1,96 @@
+"""
+Mipmap chain generation for RGBA uint8 arrays
+Every level halves both dimensions (rounding down) like TEXFile.calculate_mip_size,
+filtering either with a 2x2 box or a separable Kaiser windowed sinc
+"""
+
+import numpy as np
+
+MIP_FILTER_BOX = 'BOX'
+MIP_FILTER_KAISER = 'KAISER'
+
+KAISER_ALPHA = 4.0
+KAISER_TAPS = 8
+
+def srgb_to_linear(color):
+    return np.where(color <= 0.04045, color / 12.92, ((color + 0.055) / 1.055) ** 2.4)
+
+def linear_to_srgb(color):
+    color = np.clip(color, 0.0, 1.0)
+    return np.where(color <= 0.0031308, color * 12.92, 1.055 * (color ** (1.0 / 2.4)) - 0.055)
+
+def _kaiser_kernel():
+    """weights for a 2:1 reduction, source pixel offsets from the destination center run -3.5 to 3.5"""
+    offsets = np.arange(KAISER_TAPS) - (KAISER_TAPS - 1) / 2.0
+    window = np.kaiser(KAISER_TAPS, KAISER_ALPHA)
+    weights = np.sinc(offsets / 2.0) * window
+    return weights / weights.sum()
+
+def _kaiser_downsample_axis(image, axis):
+    kernel = _kaiser_kernel()
+    source_size = image.shape[axis]
+    dest_size = source_size // 2
+
+    # source rows for every tap of every destination pixel, centered on 2i+0.5 like the box filter and clamped at the edges
+    first_tap = np.arange(dest_size) * 2 - KAISER_TAPS // 2 + 1
+    taps = np.clip(first_tap[:, None] + np.arange(KAISER_TAPS)[None, :], 0, source_size - 1)
+
+    gathered = np.take(image, taps, axis=axis)
+    kernel_shape = [1] * gathered.ndim
+    kernel_shape[axis + 1] = KAISER_TAPS
+    return (gathered * kernel.reshape(kernel_shape)).sum(axis=axis + 1)
+
+def _box_downsample(image):
+    height = (image.shape[0] // 2) * 2
+    width = (image.shape[1] // 2) * 2
+    image = image[:height, :width]
+    return image.reshape(height // 2, 2, width // 2, 2, image.shape[2]).mean(axis=(1, 3))
+
+def _alpha_coverage(alpha, cutoff):
+    return np.count_nonzero(alpha > cutoff) / alpha.size
+
+def _scale_alpha_to_coverage(alpha, coverage, cutoff):
+    """scale alpha so the fraction of texels above the cutoff is as close as possible to the given coverage"""
+    if coverage <= 0.0 or coverage >= 1.0:
+        return alpha
+
+    # coverage only grows with the scale, binary search it
+    low, high = 0.0, 4.0
+    for i in range(16):
+        scale = (low + high) / 2.0
+        if _alpha_coverage(np.clip(alpha * scale, 0.0, 1.0), cutoff) < coverage:
+            low = scale
+        else:
+            high = scale
+    return np.clip(alpha * ((low + high) / 2.0), 0.0, 1.0)
+
+def generate_mip_chain(rgba, mip_filter=MIP_FILTER_BOX, gamma_correct=True, preserve_alpha_coverage=False,
+                       alpha_cutoff=0.5, min_size=1, max_levels=None):
+    """build a list of (height, width, 4) RGBA uint8 levels, starting with the given image.
+    Levels are added until either dimension would drop below min_size."""
+    levels = [np.ascontiguousarray(rgba, dtype=np.uint8)]
+
+    image = rgba.astype(np.float64) / 255.0
+    if gamma_correct:
+        image[:, :, :3] = srgb_to_linear(image[:, :, :3])
+    coverage = _alpha_coverage(image[:, :, 3], alpha_cutoff) if preserve_alpha_coverage else None
+
+    while max_levels is None or len(levels) < max_levels:
+        height, width = image.shape[:2]
+        if height // 2 < max(min_size, 1) or width // 2 < max(min_size, 1):
+            break
+
+        if mip_filter == MIP_FILTER_KAISER:
+            image = _kaiser_downsample_axis(_kaiser_downsample_axis(image, 0), 1)
+        else:
+            image = _box_downsample(image)
+        image = np.clip(image, 0.0, 1.0)
+
+        level = image.copy()
+        if gamma_correct:
+            level[:, :, :3] = linear_to_srgb(level[:, :, :3])
+        if coverage is not None:
+            level[:, :, 3] = _scale_alpha_to_coverage(level[:, :, 3], coverage, alpha_cutoff)
+        levels.append(np.clip(np.rint(level * 255.0), 0, 255).astype(np.uint8))
+
+    return levels
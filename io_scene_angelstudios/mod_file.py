@@ -0,0 +1,411 @@
+"""
+MOD/XMOD model reading without Blender
+ModFile parses ASCII (1.06 - 1.10) and binary (2.00 - 2.12) models into columnar numpy arrays.
+Coordinates are kept in AGE space, translate_vectors and translate_uvs convert them for Blender.
+This module does not import bpy.
+"""
+
+import struct
+import numpy as np
+
+from .binary_ops_arts import read_null_terminated_string
+from .file_parser import FileParser
+from .mesh_builder import triangle_strips_to_array
+
+ASCII_VERSIONS = ("1.06", "1.08", "1.09", "1.10")
+BINARY_VERSIONS = ("2.00", "2.10", "2.12")
+
+# ASCII primitive line types
+PRIM_TYPES = ["tri", "stp", "str"]
+
+# binary MOD tables, indices are 32 bit in 2.00 and 16 bit in later versions
+MOD_BIN_ADJUNCT_FIELDS = ('vertex_index', 'normal_index', 'color_index', 'uv0_index', 'uv1_index', 'matrix_index')
+MOD_BIN_PACKET_FIELDS = ('adjunct_count', 'primitive_count', 'matrix_count', 'reskin_count')
+
+# adjunct tables as returned by ModFile, missing fields are -1
+ADJUNCT_DTYPE = np.dtype([(field, np.int64) for field in MOD_BIN_ADJUNCT_FIELDS])
+
+######################################################
+# HELPERS
+######################################################
+def translate_vectors(vectors):
+    """array version of utils.translate_vector, (n, 3) AGE <-> Blender"""
+    vectors = np.asarray(vectors, dtype=np.float64).reshape(-1, 3)
+    return np.stack((-vectors[:, 0], vectors[:, 2], vectors[:, 1]), axis=1)
+
+def translate_uvs(uvs):
+    """array version of utils.translate_uv, (n, 2) AGE <-> Blender"""
+    uvs = np.asarray(uvs, dtype=np.float64).reshape(-1, 2)
+    return np.stack((uvs[:, 0], 1.0 - uvs[:, 1]), axis=1)
+
+def get_bin_adjunct_dtype(version):
+    index_type = '<u4' if version == "2.00" else '<u2'
+    return np.dtype([(field, index_type) for field in MOD_BIN_ADJUNCT_FIELDS])
+
+def get_bin_packet_dtype(version):
+    count_type = '<u4' if version == "2.00" else '<u2'
+    return np.dtype([(field, count_type) for field in MOD_BIN_PACKET_FIELDS])
+
+def get_bin_packet_number_dtype(version):
+    # primitive and matrix numbers inside packets, 2.10 and 2.12 store them as bytes
+    return np.dtype('<u4') if version == "2.00" else np.dtype('u1')
+
+def read_bin_array(file, dtype, count):
+    """read count elements of dtype with a single read"""
+    dtype = np.dtype(dtype)
+    data = file.read(dtype.itemsize * count)
+    if len(data) != dtype.itemsize * count:
+        raise Exception(f"Unexpected end of file reading {count} elements at {file.tell()}")
+    return np.frombuffer(data, dtype=dtype)
+
+def read_bin_array_at(data, offset, dtype, count):
+    """count elements of dtype from a buffer at offset, returns (array, offset after the elements)"""
+    dtype = np.dtype(dtype)
+    end = offset + dtype.itemsize * count
+    if end > len(data):
+        raise Exception(f"Unexpected end of file reading {count} elements at {offset}")
+    return np.frombuffer(data, dtype=dtype, count=count, offset=offset), end
+
+def read_bin_primitives(data, offset, version, primitive_count):
+    """decode a packet primitive stream from a buffer at offset, degenerate triangles are left out.
+    Returns (triangle adjunct indices as a flat array, offset after the stream)"""
+    number_dtype = get_bin_packet_number_dtype(version)
+    numbers = np.frombuffer(data, dtype=number_dtype, count=(len(data) - offset) // number_dtype.itemsize, offset=offset)
+
+    # only walk the primitive headers here, the indices are expanded all at once
+    prim_starts = []
+    prim_counts = []
+    prim_clockwise = []
+    position = 0
+    for y in range(primitive_count):
+        # tri (0), str (1), stp (2)
+        if position + 1 >= len(numbers):
+            raise Exception(f"Unexpected end of file reading primitives at {offset}")
+        prim_type = numbers.item(position)
+        if prim_type == 0:
+            prim_count = 3
+            position += 1
+        elif prim_type == 1 or prim_type == 2:
+            prim_count = numbers.item(position + 1)
+            position += 2
+        else:
+            raise Exception(f"Unknown primitive type {prim_type}")
+
+        prim_starts.append(position)
+        prim_counts.append(prim_count)
+        prim_clockwise.append(prim_type == 2)
+        position += prim_count
+
+    if position > len(numbers):
+        raise Exception(f"Unexpected end of file reading primitives at {offset}")
+    triangles = triangle_strips_to_array(numbers, prim_starts, prim_counts, prim_clockwise, True)
+    return triangles.astype(np.intp), offset + position * number_dtype.itemsize
+
+def primitives_to_tri_indices(primitive_tokens):
+    """expand tokenized tri/str/stp lines to flat triangle indices all at once, leaving out degenerate triangles"""
+    indices = []
+    prim_starts = []
+    prim_counts = []
+    prim_clockwise = []
+    for tokens in primitive_tokens:
+        if tokens[0] == "tri":
+            # every 3 indices are a strip of one triangle
+            for y in range(1, len(tokens) - 2, 3):
+                prim_starts.append(len(indices))
+                prim_counts.append(3)
+                prim_clockwise.append(False)
+                indices.extend(map(int, tokens[y:y+3]))
+        else:
+            prim_starts.append(len(indices))
+            prim_counts.append(len(tokens) - 2)
+            prim_clockwise.append(tokens[0] == "stp")
+            indices.extend(map(int, tokens[2:]))
+    return triangle_strips_to_array(np.array(indices, dtype=np.intp), prim_starts, prim_counts, prim_clockwise, True)
+
+def read_mod_texture_names(filepath):
+    """the first texture of every material that has one, without reading the geometry"""
+    mod = ModFile()
+    mod.read(filepath, materials_only=True)
+    return [material.textures[0] for material in mod.materials if len(material.textures) > 0]
+
+def rows_to_array(rows, width):
+    """float rows from FileParser as an (n, width) array, extra values on a row are ignored"""
+    return np.array([row[:width] for row in rows], dtype=np.float64).reshape(-1, width)
+
+def adjunct_rows_to_array(rows):
+    """int adj rows from FileParser as an ADJUNCT_DTYPE array, missing fields are -1"""
+    adjuncts = np.full(len(rows), -1, dtype=ADJUNCT_DTYPE)
+    for field_index, field in enumerate(MOD_BIN_ADJUNCT_FIELDS):
+        adjuncts[field] = [row[field_index] if field_index < len(row) else -1 for row in rows]
+    return adjuncts
+
+class ModMaterial:
+    def __init__(self, name=""):
+        self.name = name
+        self.textures = []
+        self.ambient = (0.0, 0.0, 0.0)
+        self.diffuse = (1.0, 1.0, 1.0)
+        self.specular = (0.0, 0.0, 0.0)
+        self.shininess = 0.0
+        self.packet_count = 0
+        self.adjunct_count = 0
+        self.primitive_count = 0
+
+class ModPacket:
+    """triangles of one material, indexing into the packet adjunct table"""
+    def __init__(self, material_index, adjuncts, triangles, matrices=None):
+        self.material_index = material_index
+        self.adjuncts = adjuncts
+        self.triangles = triangles
+        self.matrices = matrices if matrices is not None else np.zeros(0, dtype=np.intp)
+
+class ModFile:
+    def is_binary(self):
+        return self.version in BINARY_VERSIONS
+
+    def get_packet_loops(self, packet):
+        """(vertex, normal, color, uv0, matrix) index arrays for every triangle corner of a packet.
+        Matrices are resolved to skeleton bone indices, anything the file doesn't have is -1"""
+        triangles = packet.triangles
+        valid = (triangles >= 0) & (triangles < len(packet.adjuncts))
+        adjuncts = np.full(len(triangles), -1, dtype=ADJUNCT_DTYPE)
+        adjuncts[valid] = packet.adjuncts[triangles[valid]]
+
+        if self.vertex_matrices is not None:
+            # ASCII models assign bones per vertex
+            table, table_indices = self.vertex_matrices, adjuncts['vertex_index']
+        else:
+            table, table_indices = packet.matrices, adjuncts['matrix_index']
+        matrices = np.full(len(triangles), -1, dtype=np.int64)
+        valid = (table_indices >= 0) & (table_indices < len(table))
+        matrices[valid] = table[table_indices[valid]]
+
+        return adjuncts['vertex_index'], adjuncts['normal_index'], adjuncts['color_index'], adjuncts['uv0_index'], matrices
+
+    def __read_ascii(self, file, materials_only):
+        parser = FileParser(file.readlines())
+
+        if parser.skip_to("version:"):
+            self.version = parser.read_tokens()[1]
+        if self.version not in ASCII_VERSIONS:
+            raise Exception("Bad MOD file version.")
+
+        if parser.skip_to("matrices:"):
+            self.matrix_count = parser.read_int()
+
+        # read geometry data
+        if materials_only:
+            for query in ("v", "n", "c", "t1", "t2"):
+                parser.skip_rows(query, 16)
+        else:
+            self.positions = rows_to_array(parser.read_float_rows("v", 16), 3)
+            self.normals = rows_to_array(parser.read_float_rows("n", 16), 3)
+            self.colors = rows_to_array(parser.read_float_rows("c", 16), 4)
+            self.uv0s = rows_to_array(parser.read_float_rows("t1", 16), 2)
+            self.uv1s = rows_to_array(parser.read_float_rows("t2", 16), 2)
+
+        # read materials
+        have_packets = False
+        while parser.skip_to("mtl", 32):
+            material_tokens = parser.read_tokens()
+            material = ModMaterial(material_tokens[1])
+
+            if parser.skip_to("packets:", 16):
+                have_packets = True
+                material.packet_count = parser.read_int()
+            elif parser.skip_to("adjuncts:", 16):
+                have_packets = False
+                material.adjunct_count = parser.read_int()
+
+                if parser.skip_to("primitives:"):
+                    material.primitive_count = parser.read_int()
+                else:
+                    raise Exception(f"Malformed material {material.name}, missing primitive count.")
+            elif self.version == "1.06" and parser.skip_to("primitives:"):
+                have_packets = False
+                material.primitive_count = parser.read_int()
+            else:
+                raise Exception(f"Malformed material {material.name}, no geometry specifiers")
+
+            # load material info
+            parser.skip_to("textures:", 16)
+            num_textures = parser.read_int()
+
+            parser.skip_to("diffuse:", 16)
+            material.diffuse = tuple(parser.read_float_array())
+            parser.skip_to("specular:", 16)
+            material.specular = tuple(parser.read_float_array())
+
+            for x in range(num_textures):
+                parser.skip_to("texture", 16)
+                texture_tokens = parser.read_tokens()
+                material.textures.append(texture_tokens[2])
+
+            if self.version == "1.10":
+                # attributes
+                parser.skip_to("attributes:", 16)
+                num_attributes = parser.read_int()
+                for x in range(num_attributes):
+                    attribute_tokens = parser.read_tokens()
+                    if attribute_tokens[0] == "float" and attribute_tokens[1] == "shininess:":
+                        material.shininess = float(attribute_tokens[2])
+
+            self.materials.append(material)
+
+        if materials_only:
+            return
+
+        # get matrices, then go back to where we were
+        before_mtx_offset = parser.tell()
+
+        mtxv = []
+        if parser.skip_to("mtxv"):
+            mtxv = parser.read_int_array()
+        if len(mtxv) > 0:
+            # bone counts, in bone order
+            self.vertex_matrices = np.repeat(np.arange(len(mtxv), dtype=np.int64), mtxv)
+
+        parser.seek(before_mtx_offset)
+
+        if not have_packets:
+            # one adjunct table shared by every material
+            adjuncts = adjunct_rows_to_array([row[:5] for row in parser.read_int_rows("adj")])
+
+            for material_index, material in enumerate(self.materials):
+                primitive_tokens = []
+                for x in range(material.primitive_count):
+                    if parser.skip_to(PRIM_TYPES):
+                        primitive_tokens.append(parser.read_tokens())
+                    else:
+                        raise Exception(f"Ran out of primitives building geometry for material {material.name}")
+                self.packets.append(ModPacket(material_index, adjuncts, primitives_to_tri_indices(primitive_tokens)))
+        else:
+            for material_index, material in enumerate(self.materials):
+                for x in range(material.packet_count):
+                    if not parser.skip_to("packet"):
+                        raise Exception(f"Ran out of packets building geometry for material {material.name}")
+
+                    # get packet info
+                    packet_tok = parser.read_tokens()
+                    num_adjuncts = int(packet_tok[1])
+                    num_primitives = int(packet_tok[2])
+
+                    # adjuncts are localized to a packet
+                    adjunct_rows = []
+                    if num_adjuncts > 0:
+                        parser.skip_to("adj")
+                        adjunct_rows = [parser.read_int_array() for y in range(num_adjuncts)]
+
+                    primitive_tokens = []
+                    if num_primitives > 0:
+                        parser.skip_to(PRIM_TYPES)
+                        primitive_tokens = [parser.read_tokens() for y in range(num_primitives)]
+
+                    self.packets.append(ModPacket(material_index, adjunct_rows_to_array(adjunct_rows), primitives_to_tri_indices(primitive_tokens)))
+
+    def __read_binary(self, file, materials_only):
+        version = file.read(13).decode('ascii', 'replace')
+        self.version = version[len("version: "):]
+        file.seek(1,1) # skip null terminator
+
+        vertex_count, normals_count, colors_count = struct.unpack('<LLL', file.read(12))
+        tex1s_count, tex2s_count = struct.unpack('<LL', file.read(8))
+        tangent_count, material_count = struct.unpack('<LL', file.read(8))
+        adjunct_count, primitive_count, self.matrix_count = struct.unpack('<LLL', file.read(12))
+
+        if self.version != "2.00":
+            file.seek(4, 1) # skip reskin count
+
+        if materials_only:
+            file.seek((vertex_count * 12) + (normals_count * 12) + (colors_count * 16) + (tex1s_count * 8) + (tex2s_count * 8), 1)
+        else:
+            self.positions = read_bin_array(file, '<f4', vertex_count * 3).reshape(-1, 3).astype(np.float64)
+            self.normals = read_bin_array(file, '<f4', normals_count * 3).reshape(-1, 3).astype(np.float64)
+            self.colors = read_bin_array(file, '<f4', colors_count * 4).reshape(-1, 4).astype(np.float64)
+            self.uv0s = read_bin_array(file, '<f4', tex1s_count * 2).reshape(-1, 2).astype(np.float64)
+            self.uv1s = read_bin_array(file, '<f4', tex2s_count * 2).reshape(-1, 2).astype(np.float64)
+
+        for x in range(material_count):
+            material = ModMaterial(read_null_terminated_string(file))
+
+            material.packet_count, material.primitive_count = struct.unpack('<LL', file.read(8))
+            texture_count, illum_type = struct.unpack('<LL', file.read(8))
+            material.ambient = struct.unpack('<ffff', file.read(16))[:3]
+            material.diffuse = struct.unpack('<ffff', file.read(16))[:3]
+            material.specular = struct.unpack('<ffff', file.read(16))[:3]
+
+            for y in range(texture_count):
+                material.textures.append(read_null_terminated_string(file))
+
+            if self.version != "2.00":
+                parameters = {}
+                parameter_count = struct.unpack('<L', file.read(4))[0]
+                for y in range(parameter_count):
+                    parameter_type = struct.unpack('<L', file.read(4))[0]
+                    parameter_name = read_null_terminated_string(file)
+                    parameter_value = None
+
+                    match parameter_type:
+                        case 2: #FLOAT
+                            parameter_value = struct.unpack('<f', file.read(4))[0]
+
+                    parameters[parameter_name] = parameter_value
+                material.shininess = parameters.get('shininess') or 0.0
+
+            self.materials.append(material)
+
+        if materials_only:
+            return
+
+        adjunct_dtype = get_bin_adjunct_dtype(self.version)
+        packet_dtype = get_bin_packet_dtype(self.version)
+        packet_number_dtype = get_bin_packet_number_dtype(self.version)
+        reskin_size = (8 if self.version == "2.00" else 4) + 16
+
+        # packets are decoded from memory, their primitive streams can't be sized without reading them
+        packet_data = file.read()
+        offset = 0
+
+        for material_index, material in enumerate(self.materials):
+            for x in range(material.packet_count):
+                packet_info, offset = read_bin_array_at(packet_data, offset, packet_dtype, 1)
+                num_adjuncts, num_primitives, num_matrices, num_reskins = packet_info.tolist()[0]
+
+                adjunct_data, offset = read_bin_array_at(packet_data, offset, adjunct_dtype, num_adjuncts)
+                adjuncts = adjunct_data.astype(ADJUNCT_DTYPE)
+
+                # no idea what these are
+                offset += num_reskins * reskin_size
+
+                triangles, offset = read_bin_primitives(packet_data, offset, self.version, num_primitives)
+
+                matrices, offset = read_bin_array_at(packet_data, offset, packet_number_dtype, num_matrices)
+                self.packets.append(ModPacket(material_index, adjuncts, triangles, matrices.astype(np.intp)))
+
+    def read(self, filepath, materials_only=False):
+        """read a model, with materials_only the geometry and packets are left empty"""
+        with open(filepath, 'rb') as file:
+            version = file.read(13)
+        if version[len(b"version: "):].decode('ascii', 'replace') in BINARY_VERSIONS:
+            with open(filepath, 'rb') as file:
+                self.__read_binary(file, materials_only)
+        else:
+            with open(filepath, 'r') as file:
+                self.__read_ascii(file, materials_only)
+
+    def __init__(self, filepath=None):
+        self.version = None
+        self.matrix_count = None
+        self.positions = np.zeros((0, 3))
+        self.normals = np.zeros((0, 3))
+        self.colors = np.zeros((0, 4))
+        self.uv0s = np.zeros((0, 2))
+        self.uv1s = np.zeros((0, 2))
+        self.materials = []
+        self.packets = []
+
+        # bone of each vertex, from the mtxv line of ASCII models. None when the packets have matrix tables instead
+        self.vertex_matrices = None
+
+        if filepath is not None:
+            self.read(filepath)
@@ -0,0 +1,58 @@
+"""
+Parses the MOD/XMOD files of a scene in worker processes while the main thread builds their objects.
+Workers only return ModFile arrays, everything touching bpy stays on the main thread.
+This module is imported by the workers, so it must not import bpy.
+"""
+
+import os, runpy, multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, BrokenExecutor
+
+from .mod_file import ModFile
+from .texture_prefetch import WORKER_BOOTSTRAP_PATH
+
+# below this, starting worker processes costs more than it saves
+MIN_PARALLEL_MODELS = 4
+
+def iter_mod_files(filepaths, max_workers=None):
+    """yields (filepath, ModFile) in the order of filepaths, parsing ahead in worker processes.
+    A file that fails in a worker is parsed again on the calling thread when it is reached,
+    so parse errors raise like parsing it directly would.
+    Models are parsed on the calling thread if there are few of them or the workers can't run."""
+    next_index = 0
+    if len(filepaths) >= MIN_PARALLEL_MODELS:
+        if max_workers is None:
+            max_workers = min(len(filepaths), os.cpu_count() or 1)
+
+        # spawn, forking Blender is not safe
+        mp_context = multiprocessing.get_context("spawn")
+
+        pending = deque()
+        with ProcessPoolExecutor(max_workers, mp_context=mp_context, initializer=runpy.run_path, initargs=(WORKER_BOOTSTRAP_PATH,)) as executor:
+            while next_index < len(filepaths):
+                try:
+                    # keep a bounded number of parsed models in flight
+                    while next_index + len(pending) < len(filepaths) and len(pending) < max_workers * 2:
+                        pending.append(executor.submit(ModFile, filepaths[next_index + len(pending)]))
+                except (BrokenExecutor, OSError) as e:
+                    print("Failed to start model parsing workers, parsing on the main thread: " + str(e))
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    break
+
+                try:
+                    mod = pending.popleft().result()
+                except BrokenExecutor as e:
+                    print("Parallel model parsing failed, parsing the remaining models on the main thread: " + str(e))
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    break
+                except Exception as e:
+                    # the worker may have failed for reasons of its own (bootstrap, pickling),
+                    # parsing here again raises real parse errors the same way a serial import would
+                    print(f"Parsing {filepaths[next_index]} in a worker failed, parsing it on the main thread: {e}")
+                    mod = ModFile(filepaths[next_index])
+
+                yield filepaths[next_index], mod
+                next_index += 1
+
+    for filepath in filepaths[next_index:]:
+        yield filepath, ModFile(filepath)
@@ -0,0 +1,180 @@
+"""
+Palette quantization for the paletted TEX formats
+Palettes are built with median cut on a sampled training set, optionally refined with k-means,
+and images are mapped onto them with optional ordered or error diffusion dithering
+"""
+
+import numpy as np
+
+PALETTE_METHOD_MEDIAN_CUT = 'MEDIAN_CUT'
+PALETTE_METHOD_KMEANS = 'KMEANS'
+
+DITHER_NONE = 'NONE'
+DITHER_ORDERED = 'ORDERED'
+DITHER_ERROR_DIFFUSION = 'ERROR_DIFFUSION'
+
+TRAINING_SAMPLE_COUNT = 65536
+KMEANS_SAMPLE_COUNT = 16384
+KMEANS_ITERATIONS = 8
+
+# pixels per nearest color batch, keeps the distance matrix in cache
+MAP_BATCH = 4096
+
+# bits per channel of the nearest color lookup grid, 32^3 RGB cells or 16^4 RGBA cells
+GRID_BITS_RGB = 5
+GRID_BITS_RGBA = 4
+
+# Floyd-Steinberg error shares for the right, below left, below and below right neighbours
+DIFFUSION_WEIGHTS = np.array((7.0, 3.0, 5.0, 1.0), dtype=np.float32) / 16.0
+
+BAYER_4X4 = (np.array(((0, 8, 2, 10),
+                       (12, 4, 14, 6),
+                       (3, 11, 1, 9),
+                       (15, 7, 13, 5)), dtype=np.float32) + 0.5) / 16.0 - 0.5
+
+def _channels(use_alpha):
+    return 4 if use_alpha else 3
+
+def _sample_pixels(pixels, sample_count, seed):
+    if len(pixels) <= sample_count:
+        return pixels
+    rng = np.random.default_rng(seed)
+    return pixels[rng.choice(len(pixels), sample_count, replace=False)]
+
+def _box_range(box):
+    return np.ptp(box, axis=0) if len(box) > 1 else np.full(box.shape[1], -1.0, dtype=np.float32)
+
+def _median_cut(samples, color_count):
+    boxes = [samples]
+    ranges = [_box_range(samples)]
+    while len(boxes) < color_count:
+        # split the box with the widest channel range
+        box_index = int(np.argmax([box_range.max() for box_range in ranges]))
+        if ranges[box_index].max() <= 0:
+            break
+
+        box = boxes.pop(box_index)
+        channel = int(np.argmax(ranges.pop(box_index)))
+        box = box[np.argsort(box[:, channel], kind='stable')]
+        median = len(box) // 2
+        boxes.extend((box[:median], box[median:]))
+        ranges.extend((_box_range(box[:median]), _box_range(box[median:])))
+
+    return np.array([box.mean(axis=0) for box in boxes], dtype=np.float32)
+
+def _nearest(pixels, palette):
+    """index of the nearest palette entry for every pixel"""
+    palette_norm = (palette * palette).sum(axis=1)
+    indices = np.empty(len(pixels), dtype=np.intp)
+    for start in range(0, len(pixels), MAP_BATCH):
+        batch = pixels[start:start + MAP_BATCH]
+        distance = palette_norm[None, :] - 2.0 * (batch @ palette.T)
+        indices[start:start + MAP_BATCH] = np.argmin(distance, axis=1)
+    return indices
+
+def _kmeans(samples, palette, iterations):
+    previous_assignment = None
+    for i in range(iterations):
+        assignment = _nearest(samples, palette)
+        if previous_assignment is not None and np.array_equal(assignment, previous_assignment):
+            break # converged, the centers wouldn't move
+        previous_assignment = assignment
+
+        counts = np.bincount(assignment, minlength=len(palette))
+        used = counts > 0
+        for channel in range(palette.shape[1]):
+            sums = np.bincount(assignment, weights=samples[:, channel], minlength=len(palette))
+            palette[used, channel] = sums[used] / counts[used]
+    return palette
+
+class _PaletteGrid:
+    """nearest palette entry for every cell of a quantized RGB(A) grid, matched by the cell centers.
+    Mapping a pixel is then a table lookup, no matter how many distinct colors an image has."""
+    def __init__(self, palette):
+        channels = palette.shape[1]
+        bits = GRID_BITS_RGBA if channels == 4 else GRID_BITS_RGB
+        self.shift = 8 - bits
+        self.weights = np.array([1 << (bits * (channels - 1 - channel)) for channel in range(channels)], dtype=np.intp)
+
+        cells = np.arange(1 << (bits * channels), dtype=np.intp)
+        quantized = (cells[:, None] // self.weights[None, :]) & ((1 << bits) - 1)
+        centers = (quantized << self.shift).astype(np.float32) + ((1 << self.shift) - 1) / 2.0
+        self.table = _nearest(centers, palette)
+
+    def lookup(self, pixels):
+        """palette index for every (n, channels) float pixel"""
+        return self.table[(np.clip(pixels, 0.0, 255.0).astype(np.intp) >> self.shift) @ self.weights]
+
+def build_palette(rgba, color_count, use_alpha, method=PALETTE_METHOD_MEDIAN_CUT, seed=0):
+    """build an RGBA uint8 palette with color_count entries for an (height, width, 4) RGBA uint8 image.
+    Without alpha only RGB is quantized and palette alpha is 255."""
+    channels = _channels(use_alpha)
+    pixels = rgba.reshape(-1, 4)[:, :channels].astype(np.float32)
+    samples = _sample_pixels(pixels, TRAINING_SAMPLE_COUNT, seed)
+
+    palette = _median_cut(samples, color_count)
+    if method == PALETTE_METHOD_KMEANS:
+        # refining on a subset of the training set moves the centers about as far for a quarter of the work
+        palette = _kmeans(_sample_pixels(samples, KMEANS_SAMPLE_COUNT, seed), palette, KMEANS_ITERATIONS)
+
+    result = np.zeros((color_count, 4), dtype=np.uint8)
+    result[:, 3] = 255
+    result[:len(palette), :channels] = np.clip(np.rint(palette), 0, 255)
+    return result
+
+def _error_diffusion(pixels, palette):
+    """Floyd-Steinberg, processed in wavefronts of pixels with equal 2 * y + x so every wave is independent"""
+    height, width, channels = pixels.shape
+    grid = _PaletteGrid(palette)
+
+    # rows padded by a column on either side and one row below, error spilling off the image lands there
+    stride = width + 2
+    work = np.zeros(((height + 1) * stride, channels), dtype=np.float32)
+    work.reshape(height + 1, stride, channels)[:height, 1:width + 1] = pixels
+    work_values = work.reshape(-1)
+
+    # pixels sorted by wave, with their offsets in the padded work buffer
+    y, x = np.mgrid[0:height, 0:width]
+    waves = (2 * y + x).reshape(-1)
+    wave_pixels = np.argsort(waves, kind='stable')
+    wave_positions = (y * stride + x + 1).reshape(-1)[wave_pixels]
+    wave_value_positions = wave_positions * channels
+    wave_ends = np.cumsum(np.bincount(waves)).tolist()
+
+    # value offsets of every neighbour channel, relative to a pixel's first value
+    neighbour_offsets = (np.array((1, stride - 1, stride, stride + 1))[:, None] * channels + np.arange(channels)).astype(np.intp)
+
+    indices = np.empty(height * width, dtype=np.intp)
+    wave_start = 0
+    for wave_end in wave_ends:
+        positions = wave_positions[wave_start:wave_end]
+        values = work[positions]
+        wave_indices = grid.lookup(values)
+        indices[wave_pixels[wave_start:wave_end]] = wave_indices
+        error = values - palette[wave_indices]
+
+        # neighbours of different pixels in a wave can overlap, add.at accumulates them
+        targets = wave_value_positions[wave_start:wave_end, None, None] + neighbour_offsets
+        np.add.at(work_values, targets.reshape(-1), (error[:, None, :] * DIFFUSION_WEIGHTS[None, :, None]).reshape(-1))
+        wave_start = wave_end
+
+    return indices.reshape(height, width)
+
+def map_to_palette(rgba, palette, use_alpha, dither=DITHER_NONE):
+    """return the (height, width) palette indices for an (height, width, 4) RGBA uint8 image"""
+    height, width = rgba.shape[:2]
+    channels = _channels(use_alpha)
+    pixels = rgba[:, :, :channels].astype(np.float32)
+    palette = palette[:, :channels].astype(np.float32)
+
+    if dither == DITHER_ERROR_DIFFUSION:
+        return _error_diffusion(pixels, palette).astype(np.uint8)
+
+    if dither == DITHER_ORDERED:
+        # offset by up to half the average spacing between palette entries
+        spread = 255.0 / max(len(palette) ** (1.0 / channels) - 1.0, 1.0)
+        threshold = np.tile(BAYER_4X4, ((height + 3) // 4, (width + 3) // 4))[:height, :width]
+        pixels = pixels + threshold[:, :, None] * spread
+
+    pixels = np.rint(pixels).reshape(-1, channels)
+    return _PaletteGrid(palette).lookup(pixels).reshape(height, width).astype(np.uint8)
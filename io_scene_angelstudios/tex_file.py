@@ -1,6 +1,10 @@
 from enum import IntEnum
-import struct, io
-import bpy
+import struct, os, mmap
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 class TEXType(IntEnum):
     P8 = 1
@@ -22,8 +26,45 @@ class TEXType(IntEnum):
     DXT3 = 24,
     DXT5 = 26
     
+def rgba_to_blender_pixels(rgba):
+    """convert an (height, width, 4) RGBA uint8 array, top row first, to a flat float buffer for Image.pixels"""
+    height, width = rgba.shape[:2]
+    
+    # one contiguous float buffer, blender images start at the bottom row
+    pixels = np.empty((height, width, 4), dtype=np.float32)
+    np.divide(rgba[::-1], np.float32(255.0), out=pixels)
+    return pixels.reshape(-1)
+    
+def rgba_to_blender_image(rgba, name='tex_image', alpha=True, pack=True):
+    """create a blender image from an (height, width, 4) RGBA uint8 array, top row first"""
+    import bpy
+    
+    height, width = rgba.shape[:2]
+    im = bpy.data.images.new(name=name, width=width, height=height, alpha=alpha)
+    im.pixels.foreach_set(rgba_to_blender_pixels(rgba))
+    im.update()
+    
+    if pack:
+        im.pack()
+        
+    return im
+    
+def blender_image_to_rgba(image):
+    """read a blender image into an (height, width, 4) RGBA uint8 array, top row first"""
+    width, height = image.size
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    
+    rgba = pixels.reshape(height, width, 4)[::-1] * 255.0
+    return np.clip(np.rint(rgba), 0, 255).astype(np.uint8)
+    
 class TEXFile:
     def to_blender_image(self, name= 'tex_image', pack = True):
+        if np is not None:
+            return rgba_to_blender_image(self.decode_mip(0), name, self.is_decoded_alpha(), pack)
+        
+        import bpy
+        
         im = bpy.data.images.new(name=name, width=self.width, height=self.height, alpha=self.is_alpha_format())
         pixels = list(im.pixels)
         
@@ -65,6 +106,10 @@ class TEXFile:
     def is_alpha_format(self):
         return self.format in (TEXType.A1R5G5B5, TEXType.A8I8, TEXType.A8, TEXType.A4I4, TEXType.DXT3, TEXType.DXT5, TEXType.P8A8, TEXType.PA4, TEXType.PA8, TEXType.RGB8888)
     
+    def is_decoded_alpha(self):
+        """alpha flag for images decoded from this texture, DXT formats decompress to RGB8888 which has alpha"""
+        return self.is_alpha_format() or self.is_compressed_format()
+        
     def is_compressed_format(self):
         return self.format in (TEXType.DXT1, TEXType.DXT3, TEXType.DXT5)
 
@@ -108,7 +153,7 @@ class TEXFile:
         if not self.is_compressed_format():
             raise Exception("Cannot decompress a texture that was not compressed in the first place")
                 
-        from .dxt_decompress import DXTBuffer
+        from .dxt_decompress import DXTBuffer, HAS_NUMPY
         
         format = self.format
         width = self.width
@@ -117,14 +162,25 @@ class TEXFile:
         
         for x in range(len(self.mipmaps)):
             dxt_data = self.mipmaps[x]
-            stream = io.BytesIO(dxt_data)
             
+            # decoders read the mip data in place and write straight into the new mip
             buf = DXTBuffer(width, height)
-            decompressed = None
-            if format == TEXType.DXT5 or format == TEXType.DXT3:
-                decompressed = buf.DXT5Decompress(stream)
-            elif format == TEXType.DXT1:
-                decompressed = buf.DXT1Decompress(stream)
+            decompressed = bytearray(width * height * 4)
+            if HAS_NUMPY:
+                image = np.frombuffer(decompressed, dtype=np.uint8).reshape(height, width, 4)
+                if format == TEXType.DXT5:
+                    buf.DXT5DecompressArray(dxt_data, image)
+                elif format == TEXType.DXT3:
+                    buf.DXT3DecompressArray(dxt_data, image)
+                elif format == TEXType.DXT1:
+                    buf.DXT1DecompressArray(dxt_data, image)
+                del image
+            else:
+                # slow path, block by block
+                if format == TEXType.DXT5 or format == TEXType.DXT3:
+                    buf.DXT5Decompress(dxt_data, decompressed)
+                elif format == TEXType.DXT1:
+                    buf.DXT1Decompress(dxt_data, decompressed)
             self.mipmaps[x] = decompressed
             
             width //= 2
@@ -236,6 +292,162 @@ class TEXFile:
             return (0, 0, 0, 0)
 
 
+    def __mip_array(self, mip_level):
+        mip_data = np.frombuffer(self.mipmaps[mip_level], dtype=np.uint8)
+        mip_data_size = self.calculate_mip_array_size(mip_level)
+        if len(mip_data) < mip_data_size:
+            mip_data = np.concatenate((mip_data, np.zeros(mip_data_size - len(mip_data), dtype=np.uint8)))
+        return mip_data[:mip_data_size]
+    
+    def __palette_array(self):
+        palette = np.zeros((256, 4), dtype=np.uint8)
+        if len(self.palette) > 0:
+            palette[:len(self.palette)] = np.rint(np.array(self.palette, dtype=np.float64) * 255)
+        return palette
+    
+    def __decode_compressed_mip(self, mip_level, width, height, out):
+        from .dxt_decompress import DXTBuffer
+        
+        buf = DXTBuffer(width, height)
+        if self.format == TEXType.DXT1:
+            return buf.DXT1DecompressArray(self.mipmaps[mip_level], out)
+        elif self.format == TEXType.DXT3:
+            return buf.DXT3DecompressArray(self.mipmaps[mip_level], out)
+        return buf.DXT5DecompressArray(self.mipmaps[mip_level], out)
+    
+    def decode_mip(self, mip_level = 0, out = None):
+        """decode a whole mip level into an (height, width, 4) RGBA uint8 array, top row first.
+        If out is given the pixels are written into it and it is returned."""
+        width, height = self.calculate_mip_size(mip_level)
+        if self.is_compressed_format():
+            return self.__decode_compressed_mip(mip_level, width, height, out)
+        
+        pixel_count = width * height
+        rgba = np.zeros((pixel_count, 4), dtype=np.uint8)
+        if pixel_count == 0:
+            return rgba.reshape(height, width, 4) if out is None else out
+        
+        fmt = self.format
+        mip_data = self.__mip_array(mip_level)
+        
+        if fmt in (TEXType.P8, TEXType.PA8):
+            rgba[:] = self.__palette_array()[mip_data]
+        elif fmt == TEXType.P8A8:
+            pairs = mip_data.reshape(-1, 2)
+            rgba[:] = self.__palette_array()[pairs[:, 0]]
+            rgba[:, 3] = pairs[:, 1]
+        elif fmt in (TEXType.P4, TEXType.PA4):
+            # two pixels per byte, low nibble first
+            nibbles = np.zeros(max(len(mip_data) * 2, pixel_count), dtype=np.uint8)
+            nibbles[0:len(mip_data) * 2:2] = mip_data & 0x0F
+            nibbles[1:len(mip_data) * 2:2] = mip_data >> 4
+            rgba[:] = self.__palette_array()[nibbles[:pixel_count]]
+        elif fmt == TEXType.A1R5G5B5:
+            color_short = mip_data.view('<u2').astype(np.uint16)
+            red = (color_short >> 10) & 0x1F
+            green = (color_short >> 5) & 0x1F
+            blue = color_short & 0x1F
+            rgba[:, 0] = (red << 3) | (red >> 2)
+            rgba[:, 1] = (green << 3) | (green >> 2)
+            rgba[:, 2] = (blue << 3) | (blue >> 2)
+            rgba[:, 3] = np.where((color_short & 0x8000) != 0, 255, 0)
+        elif fmt == TEXType.I8:
+            rgba[:, :3] = mip_data[:, None]
+            rgba[:, 3] = 255
+        elif fmt == TEXType.A8:
+            rgba[:, 3] = mip_data
+        elif fmt == TEXType.A4I4:
+            rgba[:, :3] = ((mip_data & 0x0F) * 17)[:, None]
+            rgba[:, 3] = (mip_data >> 4) * 17
+        elif fmt == TEXType.A8I8:
+            pairs = mip_data.reshape(-1, 2)
+            rgba[:, :3] = pairs[:, 1:2]
+            rgba[:, 3] = pairs[:, 0]
+        elif fmt == TEXType.RGB888:
+            rgba[:, :3] = mip_data.reshape(-1, 3)
+            rgba[:, 3] = 255
+        elif fmt == TEXType.RGB8888:
+            rgba[:] = mip_data.reshape(-1, 4)
+        
+        if out is not None:
+            out[:] = rgba.reshape(height, width, 4)
+            return out
+        return rgba.reshape(height, width, 4)
+
+    def __encode_paletted_mip(self, rgba, dither):
+        from .palette_quantizer import map_to_palette
+        
+        palette = self.__palette_array()[:self.get_palette_size()]
+        use_palette_alpha = self.format == TEXType.PA8 or self.format == TEXType.PA4
+        indices = map_to_palette(rgba, palette, use_palette_alpha, dither).reshape(-1)
+        
+        if self.format == TEXType.P8A8:
+            pairs = np.empty((len(indices), 2), dtype=np.uint8)
+            pairs[:, 0] = indices
+            pairs[:, 1] = rgba[:, :, 3].reshape(-1)
+            return pairs.tobytes()
+        elif self.format == TEXType.P4 or self.format == TEXType.PA4:
+            # two pixels per byte, low nibble first
+            if len(indices) % 2 != 0:
+                indices = np.append(indices, 0)
+            return ((indices[0::2] & 0x0F) | (indices[1::2] << 4)).astype(np.uint8).tobytes()
+        return indices.tobytes()
+    
+    def build_palette(self, rgba, method = None):
+        """build this texture's palette from an (height, width, 4) RGBA uint8 array"""
+        from .palette_quantizer import build_palette, PALETTE_METHOD_MEDIAN_CUT
+        
+        use_palette_alpha = self.format == TEXType.PA8 or self.format == TEXType.PA4
+        palette = build_palette(rgba, self.get_palette_size(), use_palette_alpha, method or PALETTE_METHOD_MEDIAN_CUT)
+        self.palette = [tuple(channel / 255 for channel in color) for color in palette.tolist()]
+        
+    def encode_mip(self, rgba, mip_level = 0, cluster_fit = False, dither = None):
+        """encode an (height, width, 4) RGBA uint8 array into mip data in this texture's format.
+        Paletted formats map onto the existing palette."""
+        height, width = rgba.shape[:2]
+        if self.is_paletted_format():
+            data = self.__encode_paletted_mip(rgba, dither)
+        elif self.format == TEXType.DXT1 or self.format == TEXType.DXT5:
+            from .dxt_compress import DXTEncoder
+            encoder = DXTEncoder(width, height)
+            if self.format == TEXType.DXT1:
+                data = encoder.DXT1Compress(rgba, cluster_fit)
+            else:
+                data = encoder.DXT5Compress(rgba, cluster_fit)
+        elif self.format == TEXType.RGB8888:
+            data = np.ascontiguousarray(rgba, dtype=np.uint8).tobytes()
+        elif self.format == TEXType.RGB888:
+            data = np.ascontiguousarray(rgba[:, :, :3], dtype=np.uint8).tobytes()
+        else:
+            raise Exception(f"Cannot encode {self.format.name} textures")
+        
+        # keep the size the reader expects for this mip
+        return data[:self.calculate_mip_array_size(mip_level)]
+        
+    def set_rgba(self, rgba, format, cluster_fit = False, palette_method = None, dither = None):
+        """replace the contents of this texture with an (height, width, 4) RGBA uint8 array"""
+        self.set_rgba_mips([rgba], format, cluster_fit, palette_method, dither)
+        
+    def set_rgba_mips(self, levels, format, cluster_fit = False, palette_method = None, dither = None):
+        """replace the contents of this texture with a chain of (height, width, 4) RGBA uint8 levels.
+        Paletted formats share one palette built from the first level."""
+        self.height, self.width = levels[0].shape[:2]
+        self.format = format
+        self.palette = []
+        self.mipmaps = []
+        
+        if self.is_paletted_format():
+            self.build_palette(levels[0], palette_method)
+        
+        for i, level in enumerate(levels):
+            if level.shape[:2] != self.calculate_mip_size(i)[::-1]:
+                raise Exception(f"Mip {i} is {level.shape[1]}x{level.shape[0]}, expected {self.calculate_mip_size(i)[0]}x{self.calculate_mip_size(i)[1]}")
+            # stop where the reader would
+            if self.calculate_mip_array_size(i) == 0:
+                break
+            self.mipmaps.append(self.encode_mip(level, i, cluster_fit, dither))
+        self.mip_count = len(self.mipmaps)
+        
     def write(self, filepath):
         with open(filepath, 'wb') as file:
             file.write(struct.pack('<HHH', self.width, self.height, self.format))
@@ -243,34 +455,114 @@ class TEXFile:
             
             if len(self.palette) > 0:
                 for col in self.palette:
-                    r,g,b,a = (int(col[2] * 255), int(col[1] * 255), int(col[0] * 255), int(col[3]) * 255)
-                    file.write(struct.pack('<BBBB', r, g, b, a))
+                    b,g,r,a = (round(col[2] * 255), round(col[1] * 255), round(col[0] * 255), round(col[3] * 255))
+                    file.write(struct.pack('<BBBB', b, g, r, a))
+                    
+                # the reader expects a full palette
+                for x in range(len(self.palette), self.get_palette_size()):
+                    file.write(struct.pack('<BBBB', 0, 0, 0, 0))
                     
             for mipmap in self.mipmaps:
                 file.write(mipmap)
             
             
-    def read(self, filepath):
+    def __read_mips_mapped(self, file, mipcount):
+        # map the file and hand out views, pages are only read once a mip is decoded
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        self.__mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        mapping_view = memoryview(self.__mapping)
+        
+        offset = file.tell()
+        for i in range(mipcount):
+            mip_data_size = self.calculate_mip_array_size(i)
+            if mip_data_size == 0:
+                break
+            self.mipmaps.append(mapping_view[offset:offset + mip_data_size])
+            offset += mip_data_size
+        mapping_view.release()
+    
+    def close(self):
+        """release the file mapping of a lazily read texture, mips still backed by it are copied into memory"""
+        if self.__mapping is None:
+            return
+        
+        for i, mipmap in enumerate(self.mipmaps):
+            if isinstance(mipmap, memoryview) and mipmap.obj is self.__mapping:
+                self.mipmaps[i] = mipmap.tobytes()
+                mipmap.release()
+        self.__mapping.close()
+        self.__mapping = None
+            
+    def __read_header(self, file):
+        width, height, format = struct.unpack('<HHH', file.read(6))
+        self.width = width
+        self.height = height
+        self.format = TEXType(format)
+        
+        mipcount, garbage, flags = struct.unpack('<HHL', file.read(8))
+        self.flags = flags
+        self.mip_count = mipcount
+        return mipcount
+    
+    def get_palette_size(self):
+        if self.format == TEXType.P4 or self.format == TEXType.PA4:
+            return 16
+        elif self.format == TEXType.P8A8 or self.format == TEXType.PA8 or self.format == TEXType.P8:
+            return 256
+        return 0
+    
+    def find_mip_for_size(self, max_size):
+        """index of the first mip no larger than max_size in either dimension, or the smallest mip in the file"""
+        mip_level = 0
+        for i in range(self.mip_count):
+            if self.calculate_mip_array_size(i) == 0:
+                break
+            mip_level = i
+            width, height = self.calculate_mip_size(i)
+            if width <= max_size and height <= max_size:
+                break
+        return mip_level
+    
+    def calculate_file_size(self, mip_count=None):
+        """size of a file holding the header, palette and the given number of mips (defaults to the header mip count)"""
+        if mip_count is None:
+            mip_count = self.mip_count
+            
+        file_size = 14 + (self.get_palette_size() * 4)
+        for i in range(mip_count):
+            mip_data_size = self.calculate_mip_array_size(i)
+            if mip_data_size == 0:
+                break
+            file_size += mip_data_size
+        return file_size
+        
+    @classmethod
+    def probe(cls, filepath):
+        """read only the header of a TEX file, the returned TEXFile has no palette or mips"""
+        tex = cls()
         with open(filepath, 'rb') as file:
-            width, height, format = struct.unpack('<HHH', file.read(6))
-            self.width = width
-            self.height = height
-            self.format = TEXType(format)
+            tex.__read_header(file)
+        return tex
             
-            mipcount, garbage, flags = struct.unpack('<HHL', file.read(8))
-            self.flags = flags
+    def read(self, filepath, lazy=False):
+        with open(filepath, 'rb') as file:
+            mipcount = self.__read_header(file)
             
             # read palette if paletted format
-            if self.format == TEXType.P4 or self.format == TEXType.PA4:
-                self.__read_palette(file, 16)
-            elif self.format == TEXType.P8A8 or self.format == TEXType.PA8 or self.format == TEXType.P8:
-                self.__read_palette(file, 256)
+            palette_size = self.get_palette_size()
+            if palette_size > 0:
+                self.__read_palette(file, palette_size)
                 
             # make opaque palette if format doesn't support alpha
             if self.format == TEXType.P8 or self.format == TEXType.P4:
                 self.__make_palette_opaque()
              
             # read mips
+            if lazy:
+                self.__read_mips_mapped(file, mipcount)
+                return
+                
             for i in range(mipcount):
                 mip_data_size = self.calculate_mip_array_size(i)
                 if mip_data_size == 0:
@@ -278,13 +570,15 @@ class TEXFile:
                 data = file.read(mip_data_size)
                 self.mipmaps.append(data)
     
-    def __init__(self, filepath=None):
+    def __init__(self, filepath=None, lazy=False):
         self.palette = []
         self.width = 0
         self.height = 0
         self.flags = 0
         self.format = TEXType.RGB8888
         self.mipmaps = []
+        self.mip_count = 0
+        self.__mapping = None
         
         if filepath is not None:
-            self.read(filepath)
+            self.read(filepath, lazy)
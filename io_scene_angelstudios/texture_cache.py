@@ -0,0 +1,146 @@
+"""
+Persistent on-disk cache of decoded TEX/XTEX RGBA buffers
+Entries are keyed by the absolute path, size and modification time of the source file and the proxy size,
+and the least recently used entries are evicted once the cache grows past its size cap
+"""
+
+import hashlib, os, struct, tempfile
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CACHE_MAGIC = b"ATC2"
+CACHE_EXTENSION = ".rgba"
+CACHE_HEADER_FORMAT = '<4sHHB'
+CACHE_HEADER_SIZE = struct.calcsize(CACHE_HEADER_FORMAT)
+
+DEFAULT_CACHE_DIRECTORY = os.path.join(tempfile.gettempdir(), "angelstudios_texture_cache")
+DEFAULT_CACHE_SIZE_MB = 1024
+
+# eviction frees space down to this fraction of the cap, so a full cache isn't scanned on every store
+CACHE_EVICT_TARGET = 0.9
+
+# cache directory -> total entry size as last scanned plus what this process stored since,
+# so stores only scan the directory once the cap is reached
+_directory_sizes = {}
+
+class TextureCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIRECTORY, max_size=DEFAULT_CACHE_SIZE_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        
+    def __get_directory_key(self):
+        return os.path.normcase(os.path.abspath(self.directory))
+        
+    def get_entry_path(self, filepath, max_size=0):
+        filepath = os.path.abspath(filepath)
+        stat = os.stat(filepath)
+        key = f"{os.path.normcase(filepath)}|{stat.st_size}|{stat.st_mtime_ns}"
+        if max_size > 0:
+            key += f"|{max_size}"
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + CACHE_EXTENSION)
+        
+    def load(self, filepath, max_size=0):
+        """return (rgba, alpha) for a cached texture, or None on a miss.
+        A max_size above 0 looks up the reduced resolution proxy of the texture."""
+        try:
+            entry_path = self.get_entry_path(filepath, max_size)
+            with open(entry_path, 'rb') as file:
+                magic, width, height, alpha = struct.unpack(CACHE_HEADER_FORMAT, file.read(CACHE_HEADER_SIZE))
+                if magic != CACHE_MAGIC:
+                    return None
+                rgba = np.fromfile(file, dtype=np.uint8, count=width * height * 4)
+            
+            if len(rgba) != width * height * 4:
+                return None
+            
+            # mark as recently used
+            os.utime(entry_path)
+        except (OSError, struct.error):
+            return None
+        
+        return (rgba.reshape(height, width, 4), alpha != 0)
+        
+    def store(self, filepath, rgba, alpha, max_size=0):
+        height, width = rgba.shape[:2]
+        try:
+            entry_path = self.get_entry_path(filepath, max_size)
+            os.makedirs(self.directory, exist_ok=True)
+            
+            # write to a temporary file first, so other Blender instances never see partial entries
+            temp_path = f"{entry_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as file:
+                file.write(struct.pack(CACHE_HEADER_FORMAT, CACHE_MAGIC, width, height, 1 if alpha else 0))
+                file.write(np.ascontiguousarray(rgba, dtype=np.uint8).tobytes())
+            os.replace(temp_path, entry_path)
+        except OSError as e:
+            print("Failed to write texture cache entry: " + str(e))
+            return
+            
+        # replaced entries are counted twice, that only makes the next scan come sooner
+        total_size = _directory_sizes.get(self.__get_directory_key())
+        if total_size is None:
+            self.evict()
+            return
+        total_size += CACHE_HEADER_SIZE + width * height * 4
+        _directory_sizes[self.__get_directory_key()] = total_size
+        if total_size > self.max_size:
+            self.evict()
+        
+    def __get_entries(self):
+        entries = []
+        try:
+            with os.scandir(self.directory) as dir_entries:
+                for entry in dir_entries:
+                    if entry.name.endswith(CACHE_EXTENSION):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            pass
+        return entries
+        
+    def evict(self):
+        """remove least recently used entries once the cache is over max_size, until it is back under the evict target"""
+        entries = self.__get_entries()
+        total_size = sum(entry[1] for entry in entries)
+        _directory_sizes[self.__get_directory_key()] = total_size
+        if total_size <= self.max_size:
+            return
+        
+        entries.sort()
+        for mtime, size, path in entries:
+            if total_size <= self.max_size * CACHE_EVICT_TARGET:
+                break
+            try:
+                os.remove(path)
+                total_size -= size
+            except OSError:
+                pass
+        _directory_sizes[self.__get_directory_key()] = total_size
+                
+    def clear(self):
+        for mtime, size, path in self.__get_entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        _directory_sizes.pop(self.__get_directory_key(), None)
+
+def get_texture_cache():
+    """return the cache configured in the add-on preferences, or None if caching is disabled"""
+    if np is None:
+        return None
+    
+    import bpy
+    addon = bpy.context.preferences.addons.get(__package__)
+    if addon is None:
+        return TextureCache()
+    
+    preferences = addon.preferences
+    if not preferences.texture_cache_enabled:
+        return None
+    
+    directory = bpy.path.abspath(preferences.texture_cache_directory) if len(preferences.texture_cache_directory) > 0 else DEFAULT_CACHE_DIRECTORY
+    return TextureCache(directory, preferences.texture_cache_size * 1024 * 1024)
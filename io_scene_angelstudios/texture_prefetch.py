@@ -0,0 +1,155 @@
+"""
+Decodes the TEX/XTEX textures of a scene in worker processes before its models are imported.
+Pixels are decoded into shared memory owned by the main thread, which only creates the Blender images.
+This module is imported by the workers, so it must not import bpy at module level.
+"""
+
+import os, struct, runpy, multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .tex_file import TEXFile, rgba_to_blender_image
+from .texture_cache import TextureCache, get_texture_cache
+
+WORKER_BOOTSTRAP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker_bootstrap.py")
+
+# below this, starting worker processes costs more than it saves
+MIN_PARALLEL_TEXTURES = 4
+
+def decode_texture_to_shared_memory(file_path, shm_name, cache_directory, cache_size, max_size=0):
+    """worker: decode a TEX file into a shared memory block, returns the alpha flag or None on failure.
+    With a max_size above 0 the first mip that fits is decoded instead of mip 0."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        cache = TextureCache(cache_directory, cache_size) if cache_directory is not None else None
+        cached = cache.load(file_path, max_size) if cache is not None else None
+        if cached is not None:
+            rgba, alpha = cached
+            if rgba.nbytes > shm.size:
+                return None
+            target = np.ndarray(rgba.shape, dtype=np.uint8, buffer=shm.buf)
+            try:
+                target[:] = rgba
+            finally:
+                del target
+            return alpha
+        
+        tex = TEXFile(file_path, lazy=True)
+        try:
+            if not tex.is_valid():
+                return None
+            mip_level = tex.find_mip_for_size(max_size) if max_size > 0 else 0
+            width, height = tex.calculate_mip_size(mip_level)
+            if width * height * 4 > shm.size:
+                return None
+            
+            # decode straight into the shared block
+            target = np.ndarray((height, width, 4), dtype=np.uint8, buffer=shm.buf)
+            try:
+                tex.decode_mip(mip_level, target)
+                if cache is not None:
+                    cache.store(file_path, target, tex.is_decoded_alpha(), max_size)
+            finally:
+                # shm.close() raises BufferError while a view of the block is alive
+                del target
+            return tex.is_decoded_alpha()
+        finally:
+            tex.close()
+    finally:
+        shm.close()
+
+def find_prefetch_jobs(texture_requests, texture_index, max_size=0):
+    """resolve (tex_name, search_paths) requests to (tex_name, file_path, width, height) decode jobs"""
+    import bpy
+    from . import utils
+    
+    jobs = []
+    seen_names = set()
+    for tex_name, search_paths in texture_requests:
+        if tex_name in seen_names or bpy.data.images.get(tex_name) is not None:
+            continue
+        seen_names.add(tex_name)
+        
+        # only the file the regular loader would pick first is prefetched
+        for file_path in texture_index.find(tex_name, search_paths, utils.TEXTURE_EXTENSIONS):
+            file_path_l = file_path.lower()
+            if file_path_l.endswith(".tex") or file_path_l.endswith(".xtex"):
+                try:
+                    header = TEXFile.probe(file_path)
+                except (OSError, struct.error, ValueError):
+                    break
+                width, height = header.calculate_mip_size(header.find_mip_for_size(max_size) if max_size > 0 else 0)
+                if width > 0 and height > 0:
+                    jobs.append((tex_name, file_path, width, height))
+            break
+    return jobs
+
+def prefetch_textures(texture_requests, texture_index, max_workers=None, max_size=0):
+    """decode scene textures in parallel and create their images, returns the number of images created.
+    Textures that are not created here are left for the regular loader."""
+    if np is None:
+        return 0
+    
+    jobs = find_prefetch_jobs(texture_requests, texture_index, max_size)
+    if len(jobs) < MIN_PARALLEL_TEXTURES:
+        return 0
+    
+    cache = get_texture_cache()
+    cache_args = (cache.directory, cache.max_size) if cache is not None else (None, 0)
+    if max_workers is None:
+        max_workers = min(len(jobs), os.cpu_count() or 1)
+    
+    # spawn, forking Blender is not safe
+    mp_context = multiprocessing.get_context("spawn")
+    
+    created = 0
+    pending = {}
+    next_job = 0
+    try:
+        with ProcessPoolExecutor(max_workers, mp_context=mp_context, initializer=runpy.run_path, initargs=(WORKER_BOOTSTRAP_PATH,)) as executor:
+            while next_job < len(jobs) or len(pending) > 0:
+                # keep a bounded number of decoded images in flight
+                while next_job < len(jobs) and len(pending) < max_workers * 2:
+                    job = jobs[next_job]
+                    next_job += 1
+                    tex_name, file_path, width, height = job
+                    shm = shared_memory.SharedMemory(create=True, size=width * height * 4)
+                    future = executor.submit(decode_texture_to_shared_memory, file_path, shm.name, *cache_args, max_size)
+                    pending[future] = (job, shm)
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    (tex_name, file_path, width, height), shm = pending.pop(future)
+                    try:
+                        alpha = future.result()
+                        if alpha is not None:
+                            rgba = np.ndarray((height, width, 4), dtype=np.uint8, buffer=shm.buf)
+                            try:
+                                image = rgba_to_blender_image(rgba, tex_name, alpha)
+                                image.filepath_raw = file_path # set filepath manually for TEX stuff, since it didn't come from an actual file import
+                            finally:
+                                # shm.close() raises BufferError while a view of the block is alive
+                                del rgba
+                            created += 1
+                    except Exception as e:
+                        print(f"Failed to decode texture {file_path}: {e}")
+                    finally:
+                        shm.close()
+                        shm.unlink()
+    except Exception as e:
+        print("Parallel texture decoding failed, remaining textures load on import: " + str(e))
+    finally:
+        for job, shm in pending.values():
+            shm.close()
+            shm.unlink()
+    
+    # workers only track what they stored themselves, check the whole cache once
+    if cache is not None:
+        cache.evict()
+    
+    return created
@@ -1,6 +1,7 @@
 import bpy, mathutils
 import os, struct, math
 from bpy_extras.io_utils import axis_conversion
+from .binary_ops_arts import read_null_terminated_string
 
 MATRIX_TYPE_NONE = 0
 MATRIX_TYPE_PIVOT = 1
@@ -67,17 +68,6 @@ def det_object_mtx_type(ob):
      return MATRIX_TYPE_NONE
    
 
-# TODO: determine a proper name for this
-# ReadToken() binary implementation    
-def read_null_terminated_string(file):
-    str = ""
-    while True:
-        c = file.read(1)
-        if c == b"\x00" or c == b"\x20":
-            break
-        str += c.decode('ascii')
-    return str
-
 def read_matrix3x4(name, directory):
     """search for *.mtx and load if found"""
     matrix_path = os.path.join(directory, f"{name}.mtx")
@@ -163,21 +153,47 @@ def get_image_name_from_path_noext(image_path):
     withext = get_image_name_from_path(image_path)
     return os.path.splitext(withext)[0]
 
-def _load_texture_from_path(file_path):
-    from .tex_file import TEXFile
+def _load_texture_from_path(file_path, image_name=None, max_size=0):
+    """load an image, TEX files above max_size (if > 0) are loaded from their first mip that fits"""
+    from .tex_file import TEXFile, rgba_to_blender_image
+    from .texture_cache import get_texture_cache
     
     # extract the filename for manual image format names
-    image_name= os.path.splitext(os.path.basename(file_path))[0]   
+    if image_name is None:
+        image_name = os.path.splitext(os.path.basename(file_path))[0]   
     if file_path.lower().endswith(".tex") or file_path.lower().endswith(".xtex"):
-        tf = TEXFile(file_path)
-        if tf.is_valid():
-            if tf.is_compressed_format():
-                tf.decompress()
-            tf_img = tf.to_blender_image(image_name)
-            tf_img.filepath_raw = file_path # set filepath manually for TEX stuff, since it didn't come from an actual file import
-            return tf_img
-        else:
-            print("Invalid TEX file: " + file_path)
+        # decoded textures are cached across imports
+        cache = get_texture_cache()
+        if cache is not None:
+            cached = cache.load(file_path, max_size)
+            if cached is not None:
+                rgba, alpha = cached
+                tf_img = rgba_to_blender_image(rgba, image_name, alpha)
+                tf_img.filepath_raw = file_path
+                return tf_img
+        
+        # the file stays mapped until closed, which locks it on Windows
+        tf = TEXFile(file_path, lazy=True)
+        try:
+            if tf.is_valid():
+                mip_level = tf.find_mip_for_size(max_size) if max_size > 0 else 0
+                if cache is not None or mip_level > 0:
+                    rgba = tf.decode_mip(mip_level)
+                    if cache is not None:
+                        cache.store(file_path, rgba, tf.is_decoded_alpha(), max_size)
+                    tf_img = rgba_to_blender_image(rgba, image_name, tf.is_decoded_alpha())
+                    tf_img.filepath_raw = file_path
+                    return tf_img
+                
+                if tf.is_compressed_format():
+                    tf.decompress()
+                tf_img = tf.to_blender_image(image_name)
+                tf_img.filepath_raw = file_path # set filepath manually for TEX stuff, since it didn't come from an actual file import
+                return tf_img
+            else:
+                print("Invalid TEX file: " + file_path)
+        finally:
+            tf.close()
     else:
         img = bpy.data.images.load(file_path)
         return img
@@ -188,56 +204,96 @@ def _image_load_placeholder(name, path):
     image = bpy.data.images.new(name, 128, 128)
     image.filepath_raw = path
     return image
+
+TEXTURE_EXTENSIONS = (".tex", ".xtex", ".tga", ".bmp", ".png")
+DDS_TEXTURE_EXTENSIONS = (".dds",)
+
+class TextureSearchIndex:
+    """case insensitive map of texture names to files, built with one directory listing per search path"""
+    def __init__(self):
+        self.__directories = {}
+        
+    def __get_directory(self, directory):
+        directory_key = os.path.normcase(os.path.abspath(directory))
+        files = self.__directories.get(directory_key)
+        if files is None:
+            files = {}
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        stem, ext = os.path.splitext(entry.name)
+                        if len(ext) > 0 and entry.is_file():
+                            files.setdefault(stem.lower(), {})[ext.lower()] = entry.path
+            except OSError:
+                pass # missing search paths are fine
+            self.__directories[directory_key] = files
+        return files
+        
+    def find(self, tex_name, search_paths, extensions=TEXTURE_EXTENSIONS):
+        """yield matching files by search path order, then extension order"""
+        tex_name_l = tex_name.lower()
+        for search_path in search_paths:
+            stem_files = self.__get_directory(search_path).get(tex_name_l)
+            if stem_files is None:
+                continue
+            for ext in extensions:
+                if ext in stem_files:
+                    yield stem_files[ext]
+        
+class MaterialRegistry:
+    """materials shared by all models of one import, so equal materials are created only once.
+    Keys are tuples of the material name and whatever else makes two materials differ"""
+    def __init__(self):
+        self.__materials = {}
+        
+    def get(self, key):
+        material = self.__materials.get(key)
+        if material is not None:
+            try:
+                material.name # raises if the material was removed since
+            except ReferenceError:
+                del self.__materials[key]
+                material = None
+        return material
         
-def try_load_texture(tex_name, search_paths):
+    def add(self, key, material):
+        self.__materials[key] = material
+        return material
+        
+def try_load_texture(tex_name, search_paths, texture_index=None, max_size=0):
     existing_image = bpy.data.images.get(tex_name)
     if existing_image is not None:
         return existing_image
     
+    if texture_index is None:
+        texture_index = TextureSearchIndex()
+    
     bl_img = None
-    for search_path in search_paths:
-        if os.path.isdir(search_path):
-            check_file = os.path.join(search_path, tex_name + ".tex")
-            if os.path.exists(check_file):
-                bl_img = _load_texture_from_path(check_file)
-
-            if bl_img is None:
-                check_file = os.path.join(search_path, tex_name + ".xtex")
-                if os.path.exists(check_file):
-                    bl_img = _load_texture_from_path(check_file)
-
-            if bl_img is None:
-                standard_extensions = (".tga", ".bmp", ".png")
-                for ext in standard_extensions:
-                    check_file = os.path.join(search_path, tex_name + ext)
-                    if os.path.exists(check_file):
-                        bl_img = _load_texture_from_path(check_file)
-                        if bl_img is not None:
-                            break
-
-            if bl_img is not None:
-                break
+    for check_file in texture_index.find(tex_name, search_paths, TEXTURE_EXTENSIONS):
+        bl_img = _load_texture_from_path(check_file, tex_name, max_size)
+        if bl_img is not None:
+            break
 
     if bl_img is None:
-        bl_img = _image_load_placeholder(tex_name, os.path.join(search_path, tex_name))
+        bl_img = _image_load_placeholder(tex_name, os.path.join(search_paths[-1], tex_name))
     return bl_img
 
-def try_load_dds_texture(tex_name, search_paths):
+def try_load_dds_texture(tex_name, search_paths, texture_index=None):
     existing_image = bpy.data.images.get(tex_name)
     if existing_image is not None:
         return existing_image
     
+    if texture_index is None:
+        texture_index = TextureSearchIndex()
+    
     bl_img = None
-    for search_path in search_paths:
-        if os.path.isdir(search_path):
-            check_file = os.path.join(search_path, tex_name + ".dds")
-            if os.path.exists(check_file):
-                bl_img = _load_texture_from_path(check_file)
-            if bl_img is not None:
-                break
+    for check_file in texture_index.find(tex_name, search_paths, DDS_TEXTURE_EXTENSIONS):
+        bl_img = _load_texture_from_path(check_file, tex_name)
+        if bl_img is not None:
+            break
 
     if bl_img is None:
-        bl_img = _image_load_placeholder(tex_name, os.path.join(search_path, tex_name))
+        bl_img = _image_load_placeholder(tex_name, os.path.join(search_paths[-1], tex_name))
     return bl_img
    
 def fix_nan(values, default=0.0):
@@ -257,16 +313,4 @@ def translate_size(vector):
     return (vector[0], vector[2], vector[1])
 
 def round_vector(vec, places):
-    return (round(vec[0], places), round(vec[1], places), round(vec[2], places))
-
-def triangle_strip_to_list(strip, clockwise):
-    """convert a strip of triangles into a list of triangles"""
-    triangle_list = []
-    for v in range(len(strip) - 2):
-        if clockwise:
-            triangle_list.extend([strip[v+1], strip[v], strip[v+2]])
-        else:
-            triangle_list.extend([strip[v], strip[v+1], strip[v+2]])
-        clockwise = not clockwise
-
-    return triangle_list
\ No newline at end of file
+    return (round(vec[0], places), round(vec[1], places), round(vec[2], places))
\ No newline at end of file
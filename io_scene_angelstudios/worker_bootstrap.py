@@ -0,0 +1,15 @@
+"""
+Executed with runpy.run_path in worker processes before any task is unpickled.
+Registers the add-on package without running its bpy-dependent __init__, so
+workers started from a plain Python interpreter can import the bpy-free modules.
+"""
+
+import importlib.util, os, sys
+
+ADDON_PATH = os.path.dirname(os.path.abspath(__file__))
+ADDON_NAME = os.path.basename(ADDON_PATH)
+
+if ADDON_NAME not in sys.modules:
+    spec = importlib.util.spec_from_file_location(ADDON_NAME, os.path.join(ADDON_PATH, "__init__.py"),
+                                                  submodule_search_locations=[ADDON_PATH])
+    sys.modules[ADDON_NAME] = importlib.util.module_from_spec(spec)
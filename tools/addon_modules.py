@@ -0,0 +1,21 @@
+"""
+Makes the add-on modules importable outside of Blender.
+The add-on __init__ registers operators and needs bpy, so the package is
+created without running it and submodules are imported on demand.
+"""
+
+import importlib.util, os, sys
+
+ADDON_NAME = "io_scene_angelstudios"
+ADDON_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ADDON_NAME)
+
+def load_addon_package():
+    if ADDON_NAME not in sys.modules:
+        spec = importlib.util.spec_from_file_location(ADDON_NAME, os.path.join(ADDON_PATH, "__init__.py"),
+                                                      submodule_search_locations=[ADDON_PATH])
+        sys.modules[ADDON_NAME] = importlib.util.module_from_spec(spec)
+    return sys.modules[ADDON_NAME]
+
+def import_addon_module(name):
+    load_addon_package()
+    return importlib.import_module(f"{ADDON_NAME}.{name}")
@@ -0,0 +1,55 @@
+"""
+Check that the mip filters sample the same source positions
+Downsamples a linear ramp with every filter, away from the clamped edges each
+destination pixel must land on the mean of its two source pixels like the box filter does
+Usage: python mip_filter_check.py [--size 64]
+"""
+
+import argparse, sys
+
+import numpy as np
+
+from addon_modules import import_addon_module
+
+mip_chain = import_addon_module("mip_chain")
+
+TOLERANCE = 1e-9
+
+def make_ramp(size):
+    """(size, size, 4) float image whose red channel is the column index and green channel the row index"""
+    rows, columns = np.mgrid[0:size, 0:size].astype(np.float64)
+    return np.stack((columns, rows, np.zeros((size, size)), np.ones((size, size))), axis=2)
+
+def downsample(image, mip_filter):
+    if mip_filter == mip_chain.MIP_FILTER_KAISER:
+        return mip_chain._kaiser_downsample_axis(mip_chain._kaiser_downsample_axis(image, 0), 1)
+    return mip_chain._box_downsample(image)
+
+def check_filter(mip_filter, size):
+    """largest error against the box filter over the interior of a ramp, for each of a few chained levels"""
+    errors = []
+    image = make_ramp(size)
+    reference = image
+    margin = mip_chain.KAISER_TAPS // 2
+    while image.shape[0] // 2 > margin * 2:
+        image = downsample(image, mip_filter)
+        reference = mip_chain._box_downsample(reference)
+        interior = (slice(margin, -margin), slice(margin, -margin), slice(0, 2))
+        errors.append(float(np.abs(image[interior] - reference[interior]).max()))
+    return errors
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check mip filter alignment")
+    parser.add_argument("--size", type=int, default=64, help="ramp size in pixels")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for mip_filter in (mip_chain.MIP_FILTER_BOX, mip_chain.MIP_FILTER_KAISER):
+        errors = check_filter(mip_filter, args.size)
+        ok = all(error <= TOLERANCE for error in errors)
+        failed |= not ok
+        print(f"{mip_filter:>8} {'ok' if ok else 'MISALIGNED'} max error per level: {', '.join(f'{error:.3g}' for error in errors)}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Benchmark vertex welding in the MOD mesh builder
+Builds grid meshes referencing between 1k and 500k adjuncts and times collecting
+triangles and welding them, the time per adjunct should stay flat as the count grows
+Usage: python mod_weld_benchmark.py [--counts 1000 10000 100000 500000] [--json results.json]
+"""
+
+import argparse, json, sys, time
+
+import numpy as np
+
+from addon_modules import import_addon_module
+
+mesh_builder = import_addon_module("mesh_builder")
+
+DEFAULT_COUNTS = (1000, 10000, 100000, 500000)
+
+def make_grid(adjunct_count):
+    """(positions, normals, triangles) of a square grid with about adjunct_count triangle corners"""
+    side = max(2, int(np.sqrt(adjunct_count / 6.0)) + 1)
+    y, x = np.mgrid[0:side, 0:side]
+    positions = np.stack((x.reshape(-1) * 0.5, y.reshape(-1) * 0.5, np.zeros(side * side)), axis=1)
+    normals = np.tile((0.0, 0.0, 1.0), (side * side, 1))
+
+    corner = (y[:-1, :-1] * side + x[:-1, :-1]).reshape(-1)
+    triangles = np.concatenate((np.stack((corner, corner + 1, corner + side), axis=1),
+                                np.stack((corner + 1, corner + side + 1, corner + side), axis=1)))
+    return positions, normals, triangles
+
+def run_builder(positions, normals, triangles):
+    builder = mesh_builder.ModMeshBuilder()
+    loops = triangles.reshape(-1)
+    uvs = np.zeros((len(loops), 2))
+    colors = np.ones((len(loops), 4))
+
+    time1 = time.perf_counter()
+    builder.add_triangles(positions[loops], normals[loops], uvs, colors, 0)
+    time2 = time.perf_counter()
+    builder.weld()
+    time3 = time.perf_counter()
+    return time2 - time1, time3 - time2, len(builder.vertex_positions)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark MOD vertex welding")
+    parser.add_argument("--counts", type=int, nargs="+", default=DEFAULT_COUNTS, help="adjunct counts to test")
+    parser.add_argument("--json", dest="json_path", help="write the results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'adjuncts':>10} {'vertices':>10} {'collect ms':>12} {'weld ms':>10} {'ns/adjunct':>12}")
+    for count in args.counts:
+        positions, normals, triangles = make_grid(count)
+        collect_time, weld_time, vertex_count = run_builder(positions, normals, triangles)
+        adjunct_count = len(triangles) * 3
+        per_adjunct = (collect_time + weld_time) / adjunct_count * 1e9
+        results.append({
+            "adjuncts": adjunct_count,
+            "vertices": vertex_count,
+            "collect_seconds": collect_time,
+            "weld_seconds": weld_time,
+            "ns_per_adjunct": per_adjunct,
+        })
+        print(f"{adjunct_count:>10} {vertex_count:>10} {collect_time * 1000:>12.2f} {weld_time * 1000:>10.2f} {per_adjunct:>12.1f}")
+
+    if args.json_path is not None:
+        with open(args.json_path, 'w') as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Minimal PNG reader/writer for RGBA uint8 arrays, using only zlib and NumPy
+Reads every non-interlaced color type and bit depth, writes 8-bit RGB or RGBA
+"""
+
+import struct, zlib
+
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+COLOR_TYPE_GRAY = 0
+COLOR_TYPE_RGB = 2
+COLOR_TYPE_PALETTE = 3
+COLOR_TYPE_GRAY_ALPHA = 4
+COLOR_TYPE_RGBA = 6
+
+CHANNEL_COUNTS = {
+    COLOR_TYPE_GRAY: 1,
+    COLOR_TYPE_RGB: 3,
+    COLOR_TYPE_PALETTE: 1,
+    COLOR_TYPE_GRAY_ALPHA: 2,
+    COLOR_TYPE_RGBA: 4,
+}
+
+FILTER_NONE = 0
+FILTER_SUB = 1
+FILTER_UP = 2
+FILTER_AVERAGE = 3
+FILTER_PAETH = 4
+
+def _read_chunks(data):
+    if data[:8] != PNG_SIGNATURE:
+        raise Exception("Not a PNG file")
+
+    offset = 8
+    while offset + 8 <= len(data):
+        length, chunk_type = struct.unpack('>L4s', data[offset:offset + 8])
+        chunk_data = data[offset + 8:offset + 8 + length]
+        if len(chunk_data) != length:
+            raise Exception("Truncated PNG chunk " + chunk_type.decode('ascii', 'replace'))
+        yield chunk_type, chunk_data
+        offset += 12 + length
+        if chunk_type == b"IEND":
+            break
+
+def _unfilter(raw, height, row_bytes, bpp):
+    """undo the per row filters, every pixel only depends on its left, up and up-left
+    neighbours, so all pixels on one anti-diagonal are decoded at once"""
+    raw = np.frombuffer(raw, dtype=np.uint8)
+    if len(raw) < height * (row_bytes + 1):
+        raise Exception("Truncated PNG image data")
+    raw = raw[:height * (row_bytes + 1)].reshape(height, row_bytes + 1)
+    filters = raw[:, 0]
+    if filters.max(initial=0) > FILTER_PAETH:
+        raise Exception("Unknown PNG filter type")
+
+    # unfiltered rows need no work
+    if not filters.any():
+        return raw[:, 1:].copy()
+
+    unit_count = row_bytes // bpp
+    if filters.max() <= FILTER_UP:
+        # sub and up only depend on the current or previous row, decode a row at a time
+        out = np.empty((height, unit_count, bpp), dtype=np.uint8)
+        data = raw[:, 1:].reshape(height, unit_count, bpp)
+        previous = np.zeros((unit_count, bpp), dtype=np.uint8)
+        for y in range(height):
+            if filters[y] == FILTER_SUB:
+                np.cumsum(data[y], axis=0, dtype=np.uint8, out=out[y])
+            elif filters[y] == FILTER_UP:
+                np.add(data[y], previous, out=out[y])
+            else:
+                out[y] = data[y]
+            previous = out[y]
+        return out.reshape(height, row_bytes)
+
+    data = raw[:, 1:].reshape(height, unit_count, bpp).astype(np.int16)
+
+    # one row and column of zeros before the image, the filters treat outside pixels as 0
+    out = np.zeros((height + 1, unit_count + 1, bpp), dtype=np.int16)
+    for diagonal in range(height + unit_count - 1):
+        y = np.arange(max(0, diagonal - unit_count + 1), min(height - 1, diagonal) + 1)
+        x = diagonal - y
+        a = out[y + 1, x]
+        b = out[y, x + 1]
+        c = out[y, x]
+
+        p = a + b - c
+        pa = np.abs(p - a)
+        pb = np.abs(p - b)
+        pc = np.abs(p - c)
+        paeth = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+
+        row_filters = filters[y][:, None]
+        predictor = np.select((row_filters == FILTER_SUB, row_filters == FILTER_UP,
+                               row_filters == FILTER_AVERAGE, row_filters == FILTER_PAETH),
+                              (a, b, (a + b) >> 1, paeth), 0)
+        out[y + 1, x + 1] = (data[y, x] + predictor) & 0xFF
+
+    return out[1:, 1:].reshape(height, row_bytes).astype(np.uint8)
+
+def _unpack_samples(rows, width, channels, bit_depth):
+    """split unfiltered rows into (height, width, channels) samples, 16 bit samples keep their high byte"""
+    height = rows.shape[0]
+    if bit_depth == 8:
+        return rows[:, :width * channels].reshape(height, width, channels)
+    if bit_depth == 16:
+        return rows[:, 0:width * channels * 2:2].reshape(height, width, channels)
+
+    # 1, 2 and 4 bit samples, most significant bits first
+    shifts = np.arange(8 - bit_depth, -1, -bit_depth, dtype=np.uint8)
+    samples = (rows[:, :, None] >> shifts[None, None, :]) & ((1 << bit_depth) - 1)
+    samples = samples.reshape(height, -1)[:, :width * channels]
+    return samples.reshape(height, width, channels).astype(np.uint8)
+
+def read_png(filepath):
+    """read a PNG file into an (height, width, 4) RGBA uint8 array, top row first"""
+    with open(filepath, 'rb') as file:
+        data = file.read()
+
+    header = None
+    palette = None
+    transparency = None
+    idat = []
+    for chunk_type, chunk_data in _read_chunks(data):
+        if chunk_type == b"IHDR":
+            header = struct.unpack('>LLBBBBB', chunk_data[:13])
+        elif chunk_type == b"PLTE":
+            palette = np.frombuffer(chunk_data, dtype=np.uint8).reshape(-1, 3)
+        elif chunk_type == b"tRNS":
+            transparency = chunk_data
+        elif chunk_type == b"IDAT":
+            idat.append(chunk_data)
+
+    if header is None:
+        raise Exception("PNG file has no header")
+    width, height, bit_depth, color_type, compression, filter_method, interlace = header
+    if color_type not in CHANNEL_COUNTS:
+        raise Exception(f"Unknown PNG color type {color_type}")
+    if interlace != 0:
+        raise Exception("Interlaced PNG files are not supported")
+
+    channels = CHANNEL_COUNTS[color_type]
+    bits_per_pixel = channels * bit_depth
+    row_bytes = (width * bits_per_pixel + 7) // 8
+    bpp = max(1, bits_per_pixel // 8)
+
+    rows = _unfilter(zlib.decompress(b"".join(idat)), height, row_bytes, bpp)
+    samples = _unpack_samples(rows, width, channels, bit_depth)
+
+    rgba = np.empty((height, width, 4), dtype=np.uint8)
+    rgba[:, :, 3] = 255
+    if color_type == COLOR_TYPE_PALETTE:
+        if palette is None:
+            raise Exception("Paletted PNG file has no palette")
+        full_palette = np.zeros((256, 4), dtype=np.uint8)
+        full_palette[:len(palette), :3] = palette
+        full_palette[:, 3] = 255
+        if transparency is not None:
+            full_palette[:len(transparency), 3] = np.frombuffer(transparency, dtype=np.uint8)
+        rgba[:] = full_palette[samples[:, :, 0]]
+        return rgba
+
+    if bit_depth < 8:
+        # scale gray up to the full 0-255 range
+        samples = (samples.astype(np.uint16) * 255 // ((1 << bit_depth) - 1)).astype(np.uint8)
+
+    if color_type == COLOR_TYPE_GRAY or color_type == COLOR_TYPE_GRAY_ALPHA:
+        rgba[:, :, :3] = samples[:, :, 0:1]
+        if color_type == COLOR_TYPE_GRAY_ALPHA:
+            rgba[:, :, 3] = samples[:, :, 1]
+    else:
+        rgba[:, :, :channels] = samples
+
+    # single transparent color, compared at the stored bit depth
+    if transparency is not None and (color_type == COLOR_TYPE_GRAY or color_type == COLOR_TYPE_RGB):
+        key = np.array(struct.unpack(f'>{channels}H', transparency[:channels * 2]), dtype=np.uint16)
+        if bit_depth == 16:
+            stored = rows[:, :width * channels * 2].view('>u2').reshape(height, width, channels)
+        else:
+            stored = _unpack_samples(rows, width, channels, bit_depth)
+        rgba[(stored == key).all(axis=2), 3] = 0
+
+    return rgba
+
+def _filter_rows(pixels):
+    """pick the None, Sub or Up filter for every row by the smallest sum of absolute differences"""
+    height = pixels.shape[0]
+    bpp = pixels.shape[2]
+    rows = pixels.reshape(height, -1)
+
+    sub = rows.copy()
+    sub[:, bpp:] -= rows[:, :-bpp]
+    up = rows.copy()
+    up[1:] -= rows[:-1]
+
+    candidates = np.stack((rows, sub, up))
+    scores = np.minimum(candidates, 256 - candidates.astype(np.int32)).sum(axis=2)
+    best = np.argmin(scores, axis=0)
+
+    filtered = np.empty((height, rows.shape[1] + 1), dtype=np.uint8)
+    filtered[:, 0] = best
+    filtered[:, 1:] = candidates[best, np.arange(height)]
+    return filtered
+
+def _write_chunk(file, chunk_type, chunk_data):
+    file.write(struct.pack('>L', len(chunk_data)))
+    file.write(chunk_type)
+    file.write(chunk_data)
+    file.write(struct.pack('>L', zlib.crc32(chunk_type + chunk_data) & 0xFFFFFFFF))
+
+def write_png(filepath, rgba, alpha=True, compression_level=6):
+    """write an (height, width, 4) RGBA uint8 array as an 8-bit PNG, RGB only if alpha is False"""
+    height, width = rgba.shape[:2]
+    pixels = np.ascontiguousarray(rgba[:, :, :4 if alpha else 3], dtype=np.uint8)
+    color_type = COLOR_TYPE_RGBA if alpha else COLOR_TYPE_RGB
+
+    with open(filepath, 'wb') as file:
+        file.write(PNG_SIGNATURE)
+        _write_chunk(file, b"IHDR", struct.pack('>LLBBBBB', width, height, 8, color_type, 0, 0, 0))
+        _write_chunk(file, b"IDAT", zlib.compress(_filter_rows(pixels).tobytes(), compression_level))
+        _write_chunk(file, b"IEND", b"")
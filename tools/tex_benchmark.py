@@ -0,0 +1,228 @@
+"""
+Benchmark TEXFile reading and decoding for every texture format
+Synthesizes a TEX file with a full mip chain per format and size, then times reading,
+decompression, per mip decoding and conversion to Blender pixel buffers
+Paletted formats also time encoding a quantize-size image with every palette method and dither,
+runs over the quantize budget fail like regressions do
+Usage: python tex_benchmark.py [--sizes 64 256 1024 2048] [--json results.json] [--compare baseline.json]
+"""
+
+import argparse, json, os, platform, subprocess, sys, tempfile, time, tracemalloc
+
+import numpy as np
+
+from addon_modules import import_addon_module, ADDON_PATH
+
+tex_file = import_addon_module("tex_file")
+palette_quantizer = import_addon_module("palette_quantizer")
+TEXFile, TEXType = tex_file.TEXFile, tex_file.TEXType
+
+DEFAULT_SIZES = (64, 256, 1024, 2048)
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.1
+DEFAULT_QUANTIZE_SIZE = 1024
+QUANTIZE_BUDGET_SECONDS = 1.0
+SEED = 1234
+
+# depth formats can't be decoded to colors
+BENCHMARK_FORMATS = tuple(fmt for fmt in TEXType if fmt not in (TEXType.Z16, TEXType.Z24, TEXType.Z32))
+QUANTIZE_FORMATS = (TEXType.P4, TEXType.PA4, TEXType.P8, TEXType.PA8)
+PALETTE_METHODS = (palette_quantizer.PALETTE_METHOD_MEDIAN_CUT, palette_quantizer.PALETTE_METHOD_KMEANS)
+DITHERS = (palette_quantizer.DITHER_NONE, palette_quantizer.DITHER_ORDERED, palette_quantizer.DITHER_ERROR_DIFFUSION)
+
+def synthesize_tex(filepath, tex_format, size, rng):
+    """write a size x size texture of random mip data and palette, the decoders do the same work for any data"""
+    tex = TEXFile()
+    tex.width = size
+    tex.height = size
+    tex.format = tex_format
+    tex.palette = [tuple(color) for color in rng.random((tex.get_palette_size(), 4)).tolist()]
+
+    mip_level = 0
+    while tex.calculate_mip_size(mip_level)[0] > 0 and tex.calculate_mip_array_size(mip_level) > 0:
+        tex.mipmaps.append(rng.integers(0, 256, tex.calculate_mip_array_size(mip_level), dtype=np.uint8).tobytes())
+        mip_level += 1
+    tex.write(filepath)
+
+def decoded_size(tex, mip_count=1):
+    return sum(width * height * 4 for width, height in (tex.calculate_mip_size(i) for i in range(mip_count)))
+
+def read_eager(filepath):
+    return TEXFile(filepath)
+
+def read_lazy(filepath):
+    tex = TEXFile(filepath, lazy=True)
+    tex.close()
+    return tex
+
+def decompress(filepath):
+    tex = TEXFile(filepath)
+    tex.decompress()
+    return tex
+
+def decode_mip0(filepath):
+    tex = TEXFile(filepath, lazy=True)
+    tex.decode_mip(0)
+    tex.close()
+
+def decode_all_mips(filepath):
+    tex = TEXFile(filepath, lazy=True)
+    for mip_level in range(len(tex.mipmaps)):
+        tex.decode_mip(mip_level)
+    tex.close()
+
+def convert_pixels(rgba):
+    return tex_file.rgba_to_blender_pixels(rgba)
+
+def get_stages(filepath, tex):
+    """(stage name, function, argument, bytes processed) for one texture"""
+    file_size = os.path.getsize(filepath)
+    mip_count = len(read_lazy(filepath).mipmaps)
+    stages = [
+        ("read", read_eager, filepath, file_size),
+        ("read_lazy", read_lazy, filepath, file_size),
+    ]
+    if tex.is_compressed_format():
+        stages.append(("decompress", decompress, filepath, decoded_size(tex, mip_count)))
+    stages.append(("decode_mip0", decode_mip0, filepath, decoded_size(tex)))
+    stages.append(("decode_all_mips", decode_all_mips, filepath, decoded_size(tex, mip_count)))
+    stages.append(("convert_pixels", convert_pixels, TEXFile(filepath).decode_mip(0), decoded_size(tex)))
+    return stages
+
+def measure(function, argument, repeat):
+    """best wall time over repeat runs, then peak traced memory of one more run"""
+    best = None
+    for i in range(repeat):
+        time1 = time.perf_counter()
+        function(argument)
+        elapsed = time.perf_counter() - time1
+        best = elapsed if best is None else min(best, elapsed)
+
+    # traced separately, tracing slows allocation heavy code down
+    tracemalloc.start()
+    function(argument)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+def run(sizes, formats, repeat):
+    results = []
+    rng = np.random.default_rng(SEED)
+    with tempfile.TemporaryDirectory() as directory:
+        for tex_format in formats:
+            for size in sizes:
+                filepath = os.path.join(directory, f"{tex_format.name}_{size}.tex")
+                synthesize_tex(filepath, tex_format, size, rng)
+                tex = TEXFile.probe(filepath)
+
+                for stage, function, argument, byte_count in get_stages(filepath, tex):
+                    seconds, peak = measure(function, argument, repeat)
+                    result = {
+                        "format": tex_format.name,
+                        "size": size,
+                        "stage": stage,
+                        "seconds": seconds,
+                        "mb_per_s": (byte_count / (1024 * 1024)) / seconds if seconds > 0 else 0.0,
+                        "peak_mb": peak / (1024 * 1024),
+                    }
+                    results.append(result)
+                    print(f"{result['format']:<9} {size:>5} {stage:<16} {seconds * 1000:>10.3f} ms {result['mb_per_s']:>10.1f} MB/s {result['peak_mb']:>9.2f} MB peak")
+    return results
+
+def synthesize_rgba(size, rng):
+    """a size x size RGBA image of gradients plus noise, with far more distinct colors than a palette holds"""
+    y, x = np.mgrid[0:size, 0:size] * (1024.0 / size)
+    rgba = np.stack(((x / 4) % 256, (y / 4) % 256, ((x + y) / 8) % 256, (x * y / 4096) % 256), axis=2)
+    return np.clip(rgba + rng.normal(0.0, 12.0, rgba.shape), 0, 255).astype(np.uint8)
+
+def run_quantize(size, formats, repeat):
+    """time set_rgba of one image for every paletted format, palette method and dither"""
+    results = []
+    rgba = synthesize_rgba(size, np.random.default_rng(SEED))
+    for tex_format in formats:
+        for palette_method in PALETTE_METHODS:
+            for dither in DITHERS:
+                encode = lambda image: TEXFile().set_rgba(image, tex_format, palette_method=palette_method, dither=dither)
+                seconds, peak = measure(encode, rgba, repeat)
+                result = {
+                    "format": tex_format.name,
+                    "size": size,
+                    "stage": f"quantize_{palette_method.lower()}_{dither.lower()}",
+                    "seconds": seconds,
+                    "mb_per_s": (rgba.nbytes / (1024 * 1024)) / seconds if seconds > 0 else 0.0,
+                    "peak_mb": peak / (1024 * 1024),
+                }
+                results.append(result)
+                print(f"{result['format']:<9} {size:>5} {result['stage']:<36} {seconds * 1000:>10.3f} ms {result['peak_mb']:>9.2f} MB peak")
+    return results
+
+def check_quantize_budget(results, budget):
+    """print quantize stages slower than budget seconds, returns how many were"""
+    over_budget = 0
+    for entry in results:
+        if entry["stage"].startswith("quantize_") and entry["seconds"] > budget:
+            over_budget += 1
+            print(f"OVER BUDGET {entry['format']} {entry['size']} {entry['stage']}: {entry['seconds'] * 1000:.3f} ms > {budget * 1000:.0f} ms")
+    return over_budget
+
+def get_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ADDON_PATH, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_results, threshold):
+    """print stages that got slower by more than threshold, returns how many did"""
+    baseline = {(entry["format"], entry["size"], entry["stage"]): entry for entry in baseline_results}
+    regressions = 0
+    for entry in results:
+        old_entry = baseline.get((entry["format"], entry["size"], entry["stage"]))
+        if old_entry is None or old_entry["seconds"] <= 0:
+            continue
+        change = entry["seconds"] / old_entry["seconds"] - 1.0
+        if change > threshold:
+            regressions += 1
+            print(f"REGRESSION {entry['format']} {entry['size']} {entry['stage']}: "
+                  f"{old_entry['seconds'] * 1000:.3f} ms -> {entry['seconds'] * 1000:.3f} ms ({change * 100:+.1f}%)")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark TEX reading and decoding for every format")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="texture sizes to test")
+    parser.add_argument("--formats", nargs="+", choices=[fmt.name for fmt in BENCHMARK_FORMATS], help="formats to test, defaults to all")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs per stage, the best is kept")
+    parser.add_argument("--json", dest="json_path", help="write the results as JSON to this path")
+    parser.add_argument("--compare", dest="baseline_path", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="relative slowdown reported as a regression")
+    parser.add_argument("--quantize-size", type=int, default=DEFAULT_QUANTIZE_SIZE, help="image size for palette quantization timing, 0 to skip")
+    parser.add_argument("--quantize-budget", type=float, default=QUANTIZE_BUDGET_SECONDS, help="seconds a quantize stage may take")
+    args = parser.parse_args(argv)
+
+    formats = [TEXType[name] for name in args.formats] if args.formats is not None else BENCHMARK_FORMATS
+    results = run(args.sizes, formats, max(args.repeat, 1))
+    if args.quantize_size > 0:
+        results.extend(run_quantize(args.quantize_size, [fmt for fmt in QUANTIZE_FORMATS if fmt in formats], max(args.repeat, 1)))
+    over_budget = check_quantize_budget(results, args.quantize_budget)
+
+    if args.json_path is not None:
+        report = {
+            "commit": get_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+            "results": results,
+        }
+        with open(args.json_path, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline_path is not None:
+        with open(args.baseline_path, 'r') as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline["results"], args.threshold)
+        print(f"{regressions} regressions")
+        return 1 if regressions > 0 or over_budget > 0 else 0
+    return 1 if over_budget > 0 else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
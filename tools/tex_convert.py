@@ -0,0 +1,144 @@
+"""
+Convert directory trees of TEX/XTEX textures to PNG and back, in parallel
+The directory layout of the input is mirrored into the output directory
+Usage: python tex_convert.py to-png <input> <output> [--jobs 8] [--incremental]
+       python tex_convert.py from-png <input> <output> [--format AUTO] [--no-mips] [--incremental]
+"""
+
+import argparse, os, sys, time
+from concurrent.futures import ProcessPoolExecutor
+
+from addon_modules import import_addon_module
+from png_file import read_png, write_png
+
+tex_file = import_addon_module("tex_file")
+mip_chain = import_addon_module("mip_chain")
+TEXFile, TEXType = tex_file.TEXFile, tex_file.TEXType
+
+TEX_EXTENSIONS = (".tex", ".xtex")
+PNG_EXTENSIONS = (".png",)
+
+# formats TEXFile can encode, AUTO picks DXT1 or DXT5 by the image alpha
+ENCODE_FORMATS = ("AUTO", "DXT1", "DXT5", "RGB888", "RGB8888", "P8", "PA8", "P4", "PA4", "P8A8")
+
+def iter_files(directory, extensions):
+    """walk a directory tree yielding the relative path of every file with one of the extensions"""
+    pending = [directory]
+    while len(pending) > 0:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.name.lower().endswith(extensions):
+                    yield os.path.relpath(entry.path, directory)
+
+def is_up_to_date(input_path, output_path):
+    try:
+        return os.stat(output_path).st_mtime_ns >= os.stat(input_path).st_mtime_ns
+    except OSError:
+        return False
+
+def convert_tex_to_png(input_path, output_path, options):
+    tex = TEXFile(input_path, lazy=True)
+    try:
+        if not tex.is_valid():
+            raise Exception("Invalid TEX file")
+        rgba = tex.decode_mip(0)
+        write_png(output_path, rgba, tex.is_alpha_format(), options.compression_level)
+    finally:
+        tex.close()
+
+def convert_png_to_tex(input_path, output_path, options):
+    rgba = read_png(input_path)
+
+    format_name = options.format
+    if format_name == "AUTO":
+        format_name = "DXT5" if (rgba[:, :, 3] < 255).any() else "DXT1"
+
+    levels = [rgba]
+    if options.mips:
+        levels = mip_chain.generate_mip_chain(rgba, options.mip_filter, not options.linear, min_size=options.min_mip_size)
+
+    tex = TEXFile()
+    tex.set_rgba_mips(levels, TEXType[format_name], options.high_quality, options.palette_method, options.dither)
+    tex.write(output_path)
+
+def convert_file(job):
+    """worker: convert one file, returns (input_path, error message or None)"""
+    converter, input_path, output_path, options = job
+    try:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+        # write next to the output first, so an interrupted build never leaves a half written file
+        temp_path = f"{output_path}.{os.getpid()}.tmp"
+        try:
+            converter(input_path, temp_path, options)
+            os.replace(temp_path, output_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    except Exception as e:
+        return (input_path, str(e))
+    return (input_path, None)
+
+def find_jobs(options):
+    """returns (jobs, skipped count)"""
+    if options.command == "to-png":
+        converter, input_extensions, output_extension = convert_tex_to_png, TEX_EXTENSIONS, ".png"
+    else:
+        converter, input_extensions, output_extension = convert_png_to_tex, PNG_EXTENSIONS, options.extension
+
+    jobs = []
+    skipped = 0
+    for relative_path in iter_files(options.input, input_extensions):
+        input_path = os.path.join(options.input, relative_path)
+        output_path = os.path.join(options.output, os.path.splitext(relative_path)[0] + output_extension)
+        if options.incremental and is_up_to_date(input_path, output_path):
+            skipped += 1
+            continue
+        jobs.append((converter, input_path, output_path, options))
+    return jobs, skipped
+
+def run_jobs(jobs, job_count):
+    if job_count <= 1 or len(jobs) <= 1:
+        yield from map(convert_file, jobs)
+        return
+
+    with ProcessPoolExecutor(min(job_count, len(jobs))) as executor:
+        # small chunks keep the workers balanced when texture sizes vary a lot
+        yield from executor.map(convert_file, jobs, chunksize=4)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert TEX/XTEX textures to PNG and back without Blender")
+    parser.add_argument("command", choices=("to-png", "from-png"))
+    parser.add_argument("input", help="input directory, searched recursively")
+    parser.add_argument("output", help="output directory")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--incremental", action="store_true", help="skip outputs newer than their inputs")
+    parser.add_argument("--compression-level", type=int, default=6, choices=range(10), metavar="0-9", help="PNG zlib compression level")
+    parser.add_argument("--format", default="AUTO", choices=ENCODE_FORMATS, help="TEX format to write")
+    parser.add_argument("--extension", default=".tex", choices=TEX_EXTENSIONS, help="extension of written TEX files")
+    parser.add_argument("--no-mips", dest="mips", action="store_false", help="only write the full size image")
+    parser.add_argument("--mip-filter", default=mip_chain.MIP_FILTER_BOX, choices=(mip_chain.MIP_FILTER_BOX, mip_chain.MIP_FILTER_KAISER))
+    parser.add_argument("--linear", action="store_true", help="average mipmap colors without gamma correction")
+    parser.add_argument("--min-mip-size", type=int, default=1, help="stop generating mipmaps below this size")
+    parser.add_argument("--high-quality", action="store_true", help="cluster fit DXT compression, much slower")
+    parser.add_argument("--palette-method", default="MEDIAN_CUT", choices=("MEDIAN_CUT", "KMEANS"))
+    parser.add_argument("--dither", default="NONE", choices=("NONE", "ORDERED", "ERROR_DIFFUSION"))
+    options = parser.parse_args(argv)
+
+    time1 = time.perf_counter()
+    jobs, skipped = find_jobs(options)
+
+    failed = 0
+    for input_path, error in run_jobs(jobs, options.jobs):
+        if error is not None:
+            print(f"FAILED {input_path}: {error}")
+            failed += 1
+
+    print(f"{len(jobs) - failed} converted, {skipped} up to date, {failed} failed")
+    print(" done in %.4f sec." % (time.perf_counter() - time1))
+    return 1 if failed > 0 else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
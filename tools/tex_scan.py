@@ -0,0 +1,113 @@
+"""
+Scan a texture/texture_x tree using header-only TEX probes
+Reports format histograms, oversized and non power of two textures, and truncated files
+Usage: python tex_scan.py <directory> [<directory> ...] [--max-size 1024] [--json report.json]
+"""
+
+import argparse, json, os, struct, sys, time
+from collections import Counter
+
+from addon_modules import import_addon_module
+
+tex_file = import_addon_module("tex_file")
+TEXFile = tex_file.TEXFile
+
+TEX_EXTENSIONS = (".tex", ".xtex")
+
+def is_power_of_two(value):
+    return value > 0 and (value & (value - 1)) == 0
+
+def iter_tex_files(directory, errors=None):
+    """walk a directory tree yielding (path, size) for every TEX/XTEX file.
+    The size is None if the file can't be stat'ed, directories that can't be listed are added to errors"""
+    pending = [directory]
+    while len(pending) > 0:
+        path = pending.pop()
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.name.lower().endswith(TEX_EXTENSIONS):
+                        try:
+                            file_size = entry.stat().st_size
+                        except OSError:
+                            file_size = None
+                        yield (entry.path, file_size)
+        except OSError as e:
+            if errors is None:
+                raise
+            errors.append({"path": path, "error": str(e)})
+
+def scan(directories, max_size):
+    report = {
+        "count": 0,
+        "formats": Counter(),
+        "oversized": [],
+        "non_power_of_two": [],
+        "truncated": [],
+        "unreadable": [],
+    }
+    
+    for directory in directories:
+        for path, file_size in iter_tex_files(directory, report["unreadable"]):
+            report["count"] += 1
+            try:
+                tex = TEXFile.probe(path)
+            except (OSError, struct.error, ValueError) as e:
+                report["unreadable"].append({"path": path, "error": str(e)})
+                continue
+            
+            report["formats"][tex.format.name] += 1
+            if tex.width > max_size or tex.height > max_size:
+                report["oversized"].append({"path": path, "width": tex.width, "height": tex.height})
+            if not is_power_of_two(tex.width) or not is_power_of_two(tex.height):
+                report["non_power_of_two"].append({"path": path, "width": tex.width, "height": tex.height})
+            
+            expected_size = tex.calculate_file_size()
+            if file_size is not None and file_size < expected_size:
+                report["truncated"].append({"path": path, "size": file_size, "expected_size": expected_size})
+
+    report["formats"] = dict(report["formats"].most_common())
+    return report
+
+def print_report(report, max_size):
+    print(f"{report['count']} textures")
+    print("formats:")
+    for format_name, count in report["formats"].items():
+        print(f"  {format_name:<10} {count}")
+    
+    print(f"oversized (> {max_size}): {len(report['oversized'])}")
+    for entry in report["oversized"]:
+        print(f"  {entry['path']} ({entry['width']}x{entry['height']})")
+    print(f"non power of two: {len(report['non_power_of_two'])}")
+    for entry in report["non_power_of_two"]:
+        print(f"  {entry['path']} ({entry['width']}x{entry['height']})")
+    print(f"truncated: {len(report['truncated'])}")
+    for entry in report["truncated"]:
+        print(f"  {entry['path']} ({entry['size']} of {entry['expected_size']} bytes)")
+    print(f"unreadable: {len(report['unreadable'])}")
+    for entry in report["unreadable"]:
+        print(f"  {entry['path']} ({entry['error']})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan TEX/XTEX files without Blender")
+    parser.add_argument("directories", nargs="+", help="texture directories to scan recursively")
+    parser.add_argument("--max-size", type=int, default=1024, help="report textures larger than this in either dimension")
+    parser.add_argument("--json", dest="json_path", help="also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+    
+    time1 = time.perf_counter()
+    report = scan(args.directories, args.max_size)
+    print_report(report, args.max_size)
+    print(" done in %.4f sec." % (time.perf_counter() - time1))
+    
+    if args.json_path is not None:
+        with open(args.json_path, 'w') as file:
+            json.dump(report, file, indent=2)
+    
+    problems = len(report["truncated"]) + len(report["unreadable"])
+    return 1 if problems > 0 else 0
+
+if __name__ == "__main__":
+    sys.exit(main())